@@ -0,0 +1,19 @@
+from settings import *
+
+
+class AnimationClock:  # one clock for every animated sprite, sampled once per step
+    def __init__(self, frame_time=ANIMATION_SPEED):
+        self.frame_time = frame_time
+        self.tick = 0  # animation frames since the start of the round
+
+    def reset(self):
+        self.tick = 0
+
+    def update(self, t):  # t in simulation time, so replays and benchmarks step the same
+        self.tick = int(t / self.frame_time)
+
+    def spawn_phase(self):  # phase that starts a new sprite on its first frame
+        return 0 if ANIMATION_IN_SYNC else -self.tick
+
+    def frames(self, phase, frames_count):  # the frame of every sprite, one lookup for all
+        return (self.tick + phase) % frames_count
@@ -0,0 +1,19 @@
+import threading
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def session():  # keep-alive session shared by every request to the API
+    global _session
+    with _session_lock:
+        if _session is None:
+            # imported on first use, from the background threads, requests is slow to load
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4)
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+        return _session
@@ -0,0 +1,44 @@
+import pygame
+
+from settings import *
+
+
+class Backdrop:  # the blurred game behind the pause and game over screens, built once
+    def __init__(self):
+        self.key = None  # what the image shows, None when it has to be built again
+        self.image = None
+        self.chain = []  # the downsampled steps, reused from one build to the next
+        self.chain_key = None
+
+    def clear(self):
+        self.key = None
+
+    def allocate(self, source, blur_scale):
+        size = source.get_size()
+        if self.chain_key == (size, blur_scale):
+            return
+        target = (max(size[0] // blur_scale, 1), max(size[1] // blur_scale, 1))
+        self.chain = []
+        w, h = size
+        while w // 2 >= target[0] and h // 2 >= target[1]:
+            w, h = w // 2, h // 2
+            self.chain.append(pygame.Surface((w, h), 0, source))
+        if (w, h) != target:
+            self.chain.append(pygame.Surface(target, 0, source))
+        self.image = pygame.Surface(size, 0, source)
+        self.chain_key = (size, blur_scale)
+
+    def build(self, source, key, blur_scale):
+        self.allocate(source, blur_scale)
+        # halving averages 2x2 pixels at each step, a box filter that does not alias
+        # like a single scale down to 1/X
+        previous = source
+        for step in self.chain:
+            pygame.transform.smoothscale(previous, step.get_size(), step)
+            previous = step
+        pygame.transform.smoothscale(previous, self.image.get_size(), self.image)
+        self.image.fill((128, 128, 128), special_flags=pygame.BLEND_MULT)  # half as bright
+        self.key = key
+
+    def draw(self, surface):  # the renderer uses it like the background
+        surface.blit(self.image, (0, 0))
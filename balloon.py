@@ -1,38 +1,81 @@
 import random
-import time
 
 import pygame
 
 import image
+from entities import KIND_BALLOON
 from settings import *
 
 
 class Balloon:
+    __slots__ = (
+        "window_size",
+        "rect",
+        "vel",
+        "images",
+    )  # spawn state, the InsectStore owns the insect once it is added
+    sprite_paths = ("assets/balloon/balloon.png",)
+    base_size = BALLOONS_SIZES
+    size_randomize = BALLOON_SIZE_RANDOMIZE
+    kind = KIND_BALLOON
+    score = 1
+    _pool = []  # retired balloons waiting to be reused
+
     def __init__(self, window_size):
+        self.rect = pygame.Rect(0, 0, 0, 0)
+        self.respawn(window_size)
+
+    @classmethod
+    def create(cls, window_size):  # reuse a retired insect when there is one
+        if cls._pool:
+            insect = cls._pool.pop()
+            insect.respawn(window_size)
+            return insect
+        return cls(window_size)
+
+    def release(self):  # give the insect back to the pool
+        if len(self._pool) < INSECT_POOL_SIZE:
+            self._pool.append(self)
+
+    def respawn(self, window_size):
         self.window_size = window_size
         # size
         random_size_value = random.uniform(
-            BALLOON_SIZE_RANDOMIZE[0], BALLOON_SIZE_RANDOMIZE[1]
+            self.size_randomize[0], self.size_randomize[1]
         )
-        size = (
-            int(BALLOONS_SIZES[0] * random_size_value),
-            int(BALLOONS_SIZES[1] * random_size_value),
+        size = image.quantise_size(
+            (
+                int(self.base_size[0] * random_size_value),
+                int(self.base_size[1] * random_size_value),
+            )
         )
         # moving
         moving_direction, start_pos = self.define_spawn_pos(size)
         # sprite
-        self.rect = pygame.Rect(
-            start_pos[0], start_pos[1], size[0] // 1.4, size[1] // 1.4
-        )
+        self.rect.update(start_pos[0], start_pos[1], size[0] // 1.4, size[1] // 1.4)
         self.images = [
-            image.load(
-                "assets/balloon/balloon.png",
-                size=size,
-                flip=moving_direction == "right",
+            image.load_cached(path, size=size, flip=moving_direction == "right")
+            for path in self.sprite_paths
+        ]  # shared with every insect of the same size and direction
+
+    @classmethod
+    def prewarm(cls):  # scale every sprite this insect can spawn with
+        sizes = set()
+        for step in range(101):
+            value = cls.size_randomize[0] + (
+                cls.size_randomize[1] - cls.size_randomize[0]
+            ) * (step / 100)
+            sizes.add(
+                image.quantise_size(
+                    (int(cls.base_size[0] * value), int(cls.base_size[1] * value))
+                )
             )
-        ]
-        self.current_frame = 0
-        self.animation_timer = 0
+        image.prewarm(
+            (path, size, flip)
+            for path in cls.sprite_paths
+            for size in sizes
+            for flip in (False, True)
+        )
 
     def define_spawn_pos(
         self, size
@@ -64,32 +107,3 @@ class Balloon:
             )
             self.vel = [0, vel]
         return moving_direction, start_pos
-
-    def move(self):
-        self.rect.move_ip(self.vel)
-
-    def animate(self):  # change the frame of the insect when needed
-        t = time.time()
-        if t > self.animation_timer:
-            self.animation_timer = t + ANIMATION_SPEED
-            self.current_frame += 1
-            if self.current_frame > len(self.images) - 1:
-                self.current_frame = 0
-
-    def draw_hitbox(self, surface):
-        pygame.draw.rect(surface, (200, 60, 0), self.rect)
-
-    def draw(self, surface):
-        self.animate()
-        image.draw(
-            surface,
-            self.images[self.current_frame],
-            self.rect.center,
-            pos_mode="center",
-        )
-        if DRAW_HITBOX:
-            self.draw_hitbox(surface)
-
-    def kill(self, balloons):  # remove the balloon from the list
-        balloons.remove(self)
-        return 1
@@ -0,0 +1,262 @@
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+# headless: no window, no sound card
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.chdir(os.path.dirname(os.path.abspath(__file__)))  # assets are loaded relative to the game
+
+import numpy as np
+import pygame
+
+import game as game_module
+import menu as menu_module
+from camera import Camera, SyntheticCapture
+from game import Game
+from hand_tracking import HandTracking
+from menu import Menu
+from profiler import profiler
+from recording import ReplayCapture, ReplayHandTracking
+from settings import *
+
+SCENARIOS = ("menu", "round", "late_round", "pause", "game_over")
+
+
+class VirtualClock:  # stands in for the time module, one frame per tick
+    def __init__(self, fps):
+        self.now = time.time()
+        self.frame_time = 1 / fps
+
+    def time(self):
+        return self.now
+
+    def tick(self):
+        self.now += self.frame_time
+
+
+class ScriptedHandTracking(HandTracking):  # follows a fixed path instead of MediaPipe
+    def __init__(self, window_size):
+        super().__init__(window_size)
+        self.step = 0
+
+    def start(self):
+        pass
+
+    def scan_hands(self, image, source=None, timestamp=None):
+        self.step += 1
+        w, h = self.window_size
+        self.hand_x = int(w / 2 + w * 0.4 * np.sin(self.step * 0.05))
+        self.hand_y = int(h / 2 + h * 0.4 * np.sin(self.step * 0.07))
+        self.hand_closed = self.step % 20 < 10
+        self.hand_found = True
+        self.result_time = timestamp
+        return image
+
+
+class NoScores:  # stands in for the ScoreSubmitter: no outbox file, nothing sent
+    def submit(self, player_name, score):
+        pass
+
+    def close(self):
+        pass
+
+
+class BenchGame(Game):
+    tracking = "scripted"
+    replay = None
+
+    def create_hand_tracking(self):
+        if self.tracking == "scripted":
+            return ScriptedHandTracking(self.window_size)
+        if self.tracking == "replay":
+            return ReplayHandTracking(self.window_size, self.replay, self.players)
+        return super().create_hand_tracking()
+
+
+def run_scenario(name, game, menu, clock, args):
+    if name != "menu":
+        game.reset()
+        if name == "late_round":  # past the half of the round, two balloons per spawn
+            game.sim_time += GAME_DURATION * 0.6
+        elif name == "pause":
+            game.paused = True
+        elif name == "game_over":
+            game.sim_time += GAME_DURATION + 1
+            game.score_saved = True
+
+    def frame():
+        clock.tick()
+        profiler.begin_frame()
+        if name == "menu":
+            menu.update()
+            profiler.mark("menu")
+            pygame.display.flip()
+        else:
+            game.update()
+            profiler.mark("draw")
+            game.renderer.present()
+        profiler.mark("present")
+        profiler.end_frame()
+
+    for _ in range(args.warmup):
+        frame()
+
+    gc.collect()
+    collections = sum(stats["collections"] for stats in gc.get_stats())
+    if args.allocations:
+        tracemalloc.start()
+    durations = np.empty(args.frames)
+    start = time.perf_counter()
+    for i in range(args.frames):
+        t = time.perf_counter()
+        frame()
+        durations[i] = time.perf_counter() - t
+    elapsed = time.perf_counter() - start
+
+    result = {
+        "scenario": name,
+        "frames": args.frames,
+        "fps": args.frames / elapsed,
+        "p50_ms": float(np.percentile(durations, 50) * 1000),
+        "p95_ms": float(np.percentile(durations, 95) * 1000),
+        "p99_ms": float(np.percentile(durations, 99) * 1000),
+        "max_ms": float(durations.max() * 1000),
+        "gc_collections": sum(stats["collections"] for stats in gc.get_stats())
+        - collections,
+        "insects": len(game.insects) if name != "menu" else 0,
+    }
+    if args.allocations:
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result["allocated_kb"] = current / 1024
+        result["peak_kb"] = peak / 1024
+    game.paused = False
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless frame time benchmark")
+    parser.add_argument("scenarios", nargs="*", help=f"any of {', '.join(SCENARIOS)}")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--warmup", type=int, default=60)
+    parser.add_argument("--size", type=int, nargs=2, default=(SCREEN_WIDTH, SCREEN_HEIGHT))
+    parser.add_argument(
+        "--fps",
+        type=float,
+        default=FPS,
+        help="render rate the virtual clock advances by, the simulation stays fixed",
+    )
+    parser.add_argument(
+        "--camera",
+        default="synthetic",
+        help="'synthetic', a recorded session (SESSION_RECORD_PATH) or a video file",
+    )
+    parser.add_argument(
+        "--camera-fps",
+        type=float,
+        default=30,
+        help="pace of the synthetic camera, 0 for as fast as possible "
+        "(a session then plays one frame per game frame)",
+    )
+    parser.add_argument(
+        "--tracking",
+        choices=("scripted", "mediapipe", "replay"),
+        default="scripted",
+        help="replay: the landmarks recorded with the session, no inference",
+    )
+    parser.add_argument("--frenzy", action="store_true", help="run with FRENZY_MODE")
+    parser.add_argument(
+        "--quality-level",
+        type=int,
+        default=0,
+        help=f"fixed level of QUALITY_LEVELS, 0 to {len(QUALITY_LEVELS) - 1}",
+    )
+    parser.add_argument("--allocations", action="store_true", help="trace memory (slower)")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--trace", help="write the time of every stage per frame (.csv or .jsonl)")
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        help="exit with an error if a scenario p95 is above this frame time",
+    )
+    args = parser.parse_args()
+    for name in args.scenarios:
+        if name not in SCENARIOS:
+            parser.error(f"unknown scenario {name!r}")
+    args.scenarios = args.scenarios or SCENARIOS
+
+    pygame.init()
+    surface = pygame.display.set_mode(args.size)
+
+    # the game reads time.time(), a virtual clock ties the simulation to the frame count
+    clock = VirtualClock(args.fps)
+    game_module.time = clock
+    menu_module.time = clock
+    game_module.FRENZY_MODE = args.frenzy
+
+    threaded = True
+    if args.camera == "synthetic":
+        source = SyntheticCapture(fps=args.camera_fps)
+    elif os.path.exists(args.camera + ".frames"):
+        source = ReplayCapture(args.camera, realtime=args.camera_fps > 0, loop=True)
+        threaded = source.realtime  # unpaced replays are deterministic, frame by frame
+        BenchGame.replay = source
+    else:
+        source = args.camera
+    if args.tracking == "replay" and BenchGame.replay is None:
+        parser.error("--tracking replay needs a recorded session as --camera")
+    camera = Camera(source, threaded=threaded)
+
+    BenchGame.tracking = args.tracking
+    game = BenchGame(surface, None, camera=camera, score_submitter=NoScores())
+    menu = Menu(surface, game)
+    game.menu = menu
+    game.warmup.wait()  # measure the menu once the background loading is over
+    # a fixed quality level, the governor would adapt to the benchmark itself
+    game.governor.enabled = False
+    game.governor.set_level(args.quality_level, time.perf_counter())
+    if args.trace:
+        profiler.start_trace(args.trace)
+
+    results = []
+    try:
+        for name in args.scenarios:
+            results.append(run_scenario(name, game, menu, clock, args))
+    finally:
+        game.close()
+        profiler.close()
+
+    print(
+        f"{'scenario':<12}{'fps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+        f"{'max ms':>9}{'gc':>6}{'insects':>9}"
+        + (f"{'alloc kB':>10}{'peak kB':>10}" if args.allocations else "")
+    )
+    for r in results:
+        print(
+            f"{r['scenario']:<12}{r['fps']:>9.1f}{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}"
+            f"{r['p99_ms']:>9.2f}{r['max_ms']:>9.2f}{r['gc_collections']:>6}{r['insects']:>9}"
+            + (
+                f"{r['allocated_kb']:>10.1f}{r['peak_kb']:>10.1f}"
+                if args.allocations
+                else ""
+            )
+        )
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(results, file, indent=2)
+
+    if args.budget_ms is not None:
+        over = [r["scenario"] for r in results if r["p95_ms"] > args.budget_ms]
+        if over:
+            print(f"p95 over {args.budget_ms} ms: {', '.join(over)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from settings import *
+
+
+class Camera:
+    def __init__(self, source=CAMERA_INDEX, buffer_size=CAMERA_BUFFER_SIZE, threaded=True):
+        # source is a camera index, a video file or any object with a VideoCapture read()
+        # threaded=False grabs a frame on every read(), so no frame is ever skipped
+        self.cap = source if hasattr(source, "read") else cv2.VideoCapture(source)
+        self.buffer_size = max(3, buffer_size)
+        self.buffers = None  # allocated on the first frame, once the shape is known
+        self.timestamps = [0.0] * self.buffer_size
+
+        self._lock = threading.Lock()
+        self._latest = -1  # index of the newest complete frame in the ring
+        self._reading = -1  # index of the frame currently handed out to the game
+        self._frame_id = 0
+        self._last_read_id = 0
+
+        self._running = True
+        self._thread = None
+        if threaded:
+            self._thread = threading.Thread(target=self._capture_loop, daemon=True)
+            self._thread.start()
+
+    def _grab(self, slot):  # read the next frame into a slot of the ring
+        if self.buffers is None:
+            ok, frame = self.cap.read()
+            if not ok:
+                return False
+            self.buffers = [frame.copy() for _ in range(self.buffer_size)]
+            self.buffers[slot] = frame
+            return True
+        # grab straight into the preallocated slot instead of a fresh array
+        ok, frame = self.cap.read(self.buffers[slot])
+        if ok and frame is not self.buffers[slot]:  # it could not reuse it (the size changed)
+            self.buffers[slot] = frame
+        return ok
+
+    def _capture_loop(self):
+        slot = 0
+        while self._running:
+            if not self._grab(slot):
+                time.sleep(0.01)
+                continue
+            timestamp = time.perf_counter()
+
+            with self._lock:
+                self.timestamps[slot] = timestamp
+                self._latest = slot
+                self._frame_id += 1
+                # next slot: skip the one the game is reading, older frames are dropped
+                slot = (slot + 1) % self.buffer_size
+                if slot == self._reading:
+                    slot = (slot + 1) % self.buffer_size
+
+    def read(self):  # return the newest frame and its capture time, never blocks
+        if self._thread is None:
+            if not self._grab(0):
+                return None, None
+            return self.buffers[0], time.perf_counter()
+        with self._lock:
+            if self._latest < 0:
+                return None, None
+            self._reading = self._latest
+            self._last_read_id = self._frame_id
+            return self.buffers[self._reading], self.timestamps[self._reading]
+
+    def has_new_frame(self):
+        return self._thread is None or self._frame_id != self._last_read_id
+
+    def release(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+        self.cap.release()
+
+
+class SyntheticCapture:  # stands in for cv2.VideoCapture(0), for benchmarks and tests
+    def __init__(self, size=(640, 480), fps=30):
+        self.frame_time = 1 / fps if fps else 0
+        self.next_frame = time.perf_counter()
+        rng = np.random.default_rng(0)
+        self.base = rng.integers(0, 255, (size[1], size[0], 3), dtype=np.uint8)
+        self.count = 0
+
+    def read(self, image=None):
+        if self.frame_time:  # a real camera blocks until the next frame is ready
+            delay = self.next_frame - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            self.next_frame = max(self.next_frame, time.perf_counter()) + self.frame_time
+        if image is None:
+            image = self.base.copy()
+        else:
+            np.copyto(image, self.base)
+        # a moving block, so every frame is different
+        x = self.count * 8 % (image.shape[1] - 80)
+        image[100:180, x : x + 80] = 255
+        self.count += 1
+        return True, image
+
+    def release(self):
+        pass
@@ -0,0 +1,180 @@
+import numpy as np
+import pygame
+
+from animation import AnimationClock
+from settings import *
+from spatial_grid import SpatialGrid
+
+KIND_BALLOON = 0
+KIND_BEE = 1
+
+
+class InsectStore:
+    def __init__(self, capacity=64, clock=None):
+        self.count = 0
+        self.clock = AnimationClock() if clock is None else clock
+        self.insects = []  # spawn records (sprites and score), same order as the arrays
+        self.grid = SpatialGrid()
+        self.max_half_size = [0, 0]  # largest hitbox seen, to widen the grid queries
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        old = getattr(self, "pos", None)
+        arrays = {
+            "pos": ((capacity, 2), np.float32),  # hitbox center
+            "prev_pos": ((capacity, 2), np.float32),  # pos before the last step, to interpolate
+            "vel": ((capacity, 2), np.float32),
+            "half_size": ((capacity, 2), np.float32),  # half of the hitbox size
+            "sprite_half": ((capacity, 2), np.float32),  # half of the sprite size
+            "kind": ((capacity,), np.uint8),
+            "phase": ((capacity,), np.int64),  # offset of the animation from the clock
+            "frames_count": ((capacity,), np.int16),
+            "cell": ((capacity,), np.int64),  # grid cell of the hitbox center
+        }
+        for name, (shape, dtype) in arrays.items():
+            array = np.zeros(shape, dtype=dtype)
+            if old is not None:
+                array[: self.count] = getattr(self, name)[: self.count]
+            setattr(self, name, array)
+        self.capacity = capacity
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        return iter(self.insects)
+
+    def add(self, insect):
+        if self.count == self.capacity:
+            self._allocate(self.capacity * 2)
+        i = self.count
+        self.pos[i] = insect.rect.center
+        self.prev_pos[i] = self.pos[i]
+        self.vel[i] = insect.vel
+        self.half_size[i] = insect.rect.w / 2, insect.rect.h / 2
+        self.sprite_half[i] = (
+            insect.images[0].get_width() / 2,
+            insect.images[0].get_height() / 2,
+        )
+        self.kind[i] = insect.kind
+        self.phase[i] = self.clock.spawn_phase()
+        self.frames_count[i] = len(insect.images)
+        self.cell[i] = self.grid.cell_key(*self.pos[i])
+        self.grid.insert(i, self.cell[i])
+        self.max_half_size[0] = max(self.max_half_size[0], int(self.half_size[i, 0]) + 1)
+        self.max_half_size[1] = max(self.max_half_size[1], int(self.half_size[i, 1]) + 1)
+        self.insects.append(insect)
+        self.count += 1
+
+    def remove(self, i):  # swap-remove: the last insect takes the place of the removed one
+        last = self.count - 1
+        insect = self.insects[i]
+        self.grid.discard(i, self.cell[i])
+        if i != last:
+            self.grid.renumber(last, i, self.cell[last])
+            for array in self._arrays():
+                array[i] = array[last]
+            self.insects[i] = self.insects[last]
+        self.insects.pop()
+        self.count = last
+        insect.release()
+        return insect
+
+    def kill(self, i):  # remove the insect and return its score
+        return self.remove(i).score
+
+    def clear(self):
+        for insect in self.insects:
+            insect.release()
+        self.insects.clear()
+        self.grid.clear()
+        self.count = 0
+
+    def _arrays(self):
+        return (
+            self.pos,
+            self.prev_pos,
+            self.vel,
+            self.half_size,
+            self.sprite_half,
+            self.kind,
+            self.phase,
+            self.frames_count,
+            self.cell,
+        )
+
+    def move(self):  # one simulation step
+        n = self.count
+        self.prev_pos[:n] = self.pos[:n]
+        self.pos[:n] += self.vel[:n]
+        # only the insects that crossed into another cell touch the grid
+        keys = self.grid.cell_keys(self.pos[:n])
+        for i in np.flatnonzero(keys != self.cell[:n]):
+            self.grid.relocate(i, self.cell[i], keys[i])
+            self.cell[i] = keys[i]
+
+    def colliding(self, rect):  # indices of the insects whose hitbox overlaps rect
+        return self.colliding_rects([rect])[0]
+
+    def colliding_rects(self, rects):
+        # indices of the insects whose hitbox overlaps any of rects, and for each the
+        # index of the rect with the nearest center, all rects tested in one pass
+        # insects are filed under their center, widen the queries by the largest hitbox
+        padding = (self.max_half_size[0] * 2, self.max_half_size[1] * 2)
+        candidates = np.unique(
+            np.concatenate(
+                [self.grid.query(rect.inflate(padding)) for rect in rects]
+                + [np.empty(0, dtype=np.intp)]
+            )
+        )
+        if not len(candidates):
+            return candidates, candidates
+        pos = self.pos[candidates]
+        low = (pos - self.half_size[candidates])[:, None, :]
+        high = (pos + self.half_size[candidates])[:, None, :]
+        edges = np.array([(r.left, r.top, r.right, r.bottom) for r in rects], dtype=np.float32)
+        hits = (
+            (low[..., 0] < edges[:, 2])
+            & (edges[:, 0] < high[..., 0])
+            & (low[..., 1] < edges[:, 3])
+            & (edges[:, 1] < high[..., 1])
+        )  # one row per candidate, one column per rect
+        centers = (edges[:, :2] + edges[:, 2:]) / 2
+        distance = ((pos[:, None, :] - centers) ** 2).sum(axis=2)
+        distance[~hits] = np.inf
+        hit = hits.any(axis=1)
+        return candidates[hit], distance[hit].argmin(axis=1)
+
+    def cull(self, window_size):  # drop the insects that crossed the window and left it
+        n = self.count
+        if not n:
+            return
+        pos, vel, half = self.pos[:n], self.vel[:n], self.sprite_half[:n]
+        offscreen = (
+            ((vel[:, 0] > 0) & (pos[:, 0] - half[:, 0] > window_size[0]))
+            | ((vel[:, 0] < 0) & (pos[:, 0] + half[:, 0] < 0))
+            | ((vel[:, 1] > 0) & (pos[:, 1] - half[:, 1] > window_size[1]))
+            | ((vel[:, 1] < 0) & (pos[:, 1] + half[:, 1] < 0))
+        )
+        for i in np.flatnonzero(offscreen)[::-1]:  # highest first, swap-remove keeps the rest valid
+            self.remove(i)
+
+    def draw(self, surface, alpha=1.0):  # return the rects that were drawn
+        # alpha: how far the render time is between the previous and the last step
+        n = self.count
+        pos = self.prev_pos[:n] + (self.pos[:n] - self.prev_pos[:n]) * alpha
+        top_left = (pos - self.sprite_half[:n]).astype(np.int32).tolist()
+        frames = self.clock.frames(self.phase[:n], self.frames_count[:n]).tolist()
+        return surface.blits(
+            [
+                (insect.images[frame], pos)
+                for insect, frame, pos in zip(self.insects, frames, top_left)
+            ]
+        )
+
+    def draw_hitboxes(self, surface):
+        n = self.count
+        low = (self.pos[:n] - self.half_size[:n]).tolist()
+        size = (self.half_size[:n] * 2).tolist()
+        for (x, y), (w, h) in zip(low, size):
+            pygame.draw.rect(surface, (200, 60, 0), (x, y, w, h))
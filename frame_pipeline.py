@@ -0,0 +1,34 @@
+import cv2
+import numpy as np
+import pygame
+
+from settings import *
+
+
+class FramePipeline:
+    def __init__(self, size=TRACKING_FRAME_SIZE):
+        self.set_size(size)
+
+    def set_size(self, size):
+        if getattr(self, "size", None) == size:
+            return
+        self.size = size
+        w, h = size
+        # every stage writes into its own buffer, allocated once
+        self.small = np.empty((h, w, 3), dtype=np.uint8)
+        self.flipped = np.empty((h, w, 3), dtype=np.uint8)
+        self.rgb = np.zeros((h, w, 3), dtype=np.uint8)
+        # the preview surface shares its pixels with self.rgb, so it never needs rebuilding
+        self.preview = pygame.image.frombuffer(self.rgb, size, "RGB")
+        self.has_frame = False
+
+    def process(self, frame):  # camera BGR frame -> mirrored RGB frame at tracking size
+        cv2.resize(frame, self.size, dst=self.small)
+        cv2.flip(self.small, 1, dst=self.flipped)
+        cv2.cvtColor(self.flipped, cv2.COLOR_BGR2RGB, dst=self.rgb)
+        self.has_frame = True
+        return self.rgb
+
+    def draw(self, surface, pos):
+        if self.has_frame:
+            return surface.blit(self.preview, pos)
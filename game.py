@@ -1,31 +1,48 @@
-import datetime
 import random
 import time
 
-import requests
-import cv2
 import pygame
 
 import ui
+from animation import AnimationClock
+from backdrop import Backdrop
 from background import Background
 from balloon import Balloon
 from bee import Bee
-from hand import Hand
-from hand_tracking import HandTracking
+from entities import InsectStore
+from governor import QualityGovernor
+from hand import Hand, kill_insects
+from hand_filter import HandFilter
+from profiler import profiler
+from renderer import DirtyRectRenderer, RenderQueue
+from scores import ScoreSubmitter
+from startup import Warmup, startup
 from settings import *
 
+# cv2 and mediapipe take seconds to import: the modules that need them are imported
+# by the warm-up thread, while the menu is already on screen
+
 
 class Game:
-    def __init__(self, surface, menu):
-        self.window_size = pygame.display.get_window_size()
+    def __init__(self, surface, menu, camera=None, score_submitter=None):
+        self.window_size = surface.get_size()
         self.surface = surface
         self.menu = menu
         self.background = Background(self.window_size)
         self.score_saved = False
         self.player_name = ""
-
-        # Load camera
-        self.cap = cv2.VideoCapture(0)
+        # games on the same outbox share a submitter, it sends what is left in it; a shared
+        # one is closed by whoever passed it in
+        self.owns_submitter = score_submitter is None
+        self.score_submitter = score_submitter or ScoreSubmitter()
+
+        # the camera and the frame pipeline are created by the warm-up
+        self.camera = camera
+        self.frame_pipeline = None
+        self.frame = None
+        self.camera_frame = None  # the frame before the pipeline, for the tracking crops
+        self.frame_timestamp = None
+        self.recorder = None
 
         self.sounds = {}
         self.sounds["slap"] = pygame.mixer.Sound(f"assets/sounds/slap.wav")
@@ -34,230 +51,420 @@ class Game:
         self.sounds["screaming"].set_volume(SOUNDS_VOLUME)
 
         self.paused = False
+        self.overlay_shown = False
+        self.backdrop = Backdrop()
+        self.renderer = DirtyRectRenderer()
+        self.render_queue = RenderQueue()
+        self.governor = QualityGovernor()
+        self.frames_since_scan = 0
+        self.frames_since_preview = 0
+        self.hand_tracking = None  # started once by the warm-up, reset every round
+        self.players = PLAYERS
+        self.hand_filters = [HandFilter() for _ in range(self.players)]
+        self.animation = AnimationClock()
+        self.insects = InsectStore(clock=self.animation)
+        self.warmup = Warmup(
+            [
+                ("open camera", self.open_camera),
+                ("load hand tracking", self.load_hand_tracking),
+                ("prewarm sprites", self.prewarm_sprites),
+            ],
+            startup,
+        )
+
+    def open_camera(self):
+        from camera import Camera
+        from frame_pipeline import FramePipeline
+
+        # frames are grabbed on a background thread
+        if self.camera is None:
+            self.camera = Camera()
+        self.frame_pipeline = FramePipeline()
+        if SESSION_RECORD_PATH is not None:
+            from recording import SessionRecorder
+
+            self.recorder = SessionRecorder(SESSION_RECORD_PATH)
+
+    def load_hand_tracking(self):
+        self.hand_tracking = self.create_hand_tracking()
+        self.hand_tracking.start()
+
+    def prewarm_sprites(self):  # scaled once, the rounds then find them in the cache
+        if SPRITE_CACHE_PREWARM:
+            Balloon.prewarm()
+            Bee.prewarm()
 
     def reset(self):  # reset all the needed variables
-        self.hand_tracking = HandTracking(self.window_size)
-        self.hand = Hand(self.window_size)
-        self.insects = []
+        self.warmup.wait()  # usually done long before, while the name was typed
+        self.hand_tracking.window_size = self.window_size  # the window may have been resized
+        self.hand_tracking.reset()
+        for hand_filter in self.hand_filters:
+            hand_filter.reset()
+        self.apply_quality()
+        self.hands = [Hand(self.window_size) for _ in range(self.players)]
+        self.scores = [0] * self.players
+        self.insects.clear()
+        self.animation.reset()
         self.insects_spawn_timer = 0
         self.score = 0
-        self.game_start_time = time.time()
+        self.sim_time = 0  # seconds of gameplay, stops while paused
+        self.time_left = GAME_DURATION
+        self.accumulator = 0  # frame time not simulated yet
+        self.last_frame_time = time.time()
         self.score_saved = False
+        self.renderer.request_full_redraw()
+
+    def apply_quality(self):  # follow the level chosen by the quality governor
+        quality = self.governor.quality
+        # the worker shares a fixed size frame, a recording needs the same size throughout
+        if not self.hand_tracking.fixed_frame_size and self.recorder is None:
+            self.frame_pipeline.set_size(quality["tracking_size"])
+        self.hand_tracking.landmarks_overlay = quality["draw_landmarks"]
+        self.renderer.request_full_redraw()
+
+    def create_hand_tracking(self):
+        if HAND_TRACKING_MODE == "process":
+            from tracking_worker import HandTrackingWorker
+
+            return HandTrackingWorker(self.window_size, self.players)
+        from hand_tracking import HandTracking
+
+        return HandTracking(self.window_size, self.players)
 
     def spawn_insects(self):
-        t = time.time()
-        if t > self.insects_spawn_timer:
-            self.insects_spawn_timer = t + BALLOONS_SPAWN_TIME
+        if self.sim_time > self.insects_spawn_timer:
+            self.insects_spawn_timer = self.sim_time + BALLOONS_SPAWN_TIME
 
             # increase the probability that the insect will be a bee over time
             nb = (
                 (GAME_DURATION - self.time_left) / GAME_DURATION * 100 / 2
             )  # increase from 0 to 50 during all  the game (linear)
-            if random.randint(0, 100) < nb:
-                self.insects.append(Bee(self.window_size))
-            else:
-                self.insects.append(Balloon(self.window_size))
-
-            # spawn a other balloon after the half of the game
-            if self.time_left < GAME_DURATION / 2:
-                self.insects.append(Balloon(self.window_size))
-
-    def load_camera(self):
-        _, frame = self.cap.read()
-        self.frame = cv2.resize(frame, (300, 169))
+            for _ in range(FRENZY_SPAWN_MULTIPLIER if FRENZY_MODE else 1):
+                if random.randint(0, 100) < nb:
+                    self.insects.add(Bee.create(self.window_size))
+                else:
+                    self.insects.add(Balloon.create(self.window_size))
+
+                # spawn a other balloon after the half of the game
+                if self.time_left < GAME_DURATION / 2:
+                    self.insects.add(Balloon.create(self.window_size))
+
+    def load_camera(self):  # return True if the camera delivered a new frame
+        if not self.camera.has_new_frame():
+            return False
+        frame, self.frame_timestamp = self.camera.read()
+        if frame is None:
+            return False
+        self.camera_frame = frame
+        self.frame = self.frame_pipeline.process(frame)
+        return True
+
+    def update_camera(self):  # read and scan the camera at the rates of the quality level
+        quality = self.governor.quality
+        self.frames_since_scan += 1
+        self.frames_since_preview += 1
+        scan = self.frames_since_scan >= quality["inference_interval"]
+        if not scan and self.frames_since_preview < quality["preview_interval"]:
+            profiler.mark("camera")
+            return
+        if not self.load_camera():
+            profiler.mark("camera")
+            return
+        profiler.mark("camera")
+        self.frames_since_preview = 0
+        if scan:
+            self.frames_since_scan = 0
+            self.set_hand_position()
+        else:  # a preview only frame keeps showing the last landmarks
+            self.hand_tracking.draw_hands(self.frame)
+        profiler.mark("tracking")
 
     def set_hand_position(self):
-        self.frame = self.hand_tracking.scan_hands(self.frame)
-        (x, y) = self.hand_tracking.get_hand_center()
-        self.hand.rect.center = (x, y)
+        self.frame = self.hand_tracking.scan_hands(
+            self.frame, self.camera_frame, self.frame_timestamp
+        )
+        if self.recorder is not None:  # the camera frame before it was mirrored
+            self.recorder.record(
+                self.frame_pipeline.small,
+                self.frame_timestamp,
+                [tracked.landmarks for tracked in self.hand_tracking.hands],
+            )
+        for player, tracked in enumerate(self.hand_tracking.hands):
+            if tracked.found:
+                self.hand_filters[player].update(
+                    tracked.x, tracked.y, self.hand_tracking.result_time
+                )
+            self.hands[player].rect.center = self.get_hand_position(player)
+
+    def get_hand_position(self, player=0):  # where the hand is now, not where the last frame saw it
+        position = self.hand_filters[player].position() if HAND_FILTER else None
+        if position is None:
+            tracked = self.hand_tracking.hands[player]
+            return (tracked.x, tracked.y)
+        return position
+
+    def player_visible(self, player):  # a player's hand is hidden until it is found
+        if self.players == 1:
+            return True
+        tracked = self.hand_tracking.hands[player]
+        return tracked.seen and tracked.missed < PLAYER_LOST_FRAMES
 
     def draw(self):
-        # draw the background
-        self.background.draw(self.surface)
-
-        # Convert camera frame to Pygame surface and draw it
-        if hasattr(self, "frame"):
-            # Convert BGR to RGB
-            frame_rgb = cv2.cvtColor(self.frame, cv2.COLOR_BGR2RGB)
-            # Create Pygame surface from camera frame
-            frame_surface = pygame.surfarray.make_surface(frame_rgb.swapaxes(0, 1))
-            # Position in top right corner with 20px padding
-            self.surface.blit(frame_surface, (self.window_size[0] - 300, 0))
-
-        # draw the insects
-        for insect in self.insects:
-            insect.draw(self.surface)
-        # draw the hand
-        self.hand.draw(self.surface)
-        # draw the score
-        ui.draw_text(
-            self.surface,
-            f"Score : {self.score}",
-            (5, 5),
-            COLORS["score"],
-            shadow=True,
-            shadow_color=(255, 255, 255),
+        # draw the background (or only the parts that changed)
+        self.renderer.begin(self.surface, self.background)
+
+        # everything is queued by layer, then drawn with one blits call per layer
+        queue = self.render_queue
+
+        # draw the camera preview in the top right corner
+        self.renderer.mark(
+            self.frame_pipeline.draw(
+                queue["background"], (self.window_size[0] - self.frame_pipeline.size[0], 0)
+            )
         )
+
+        # draw the insects, between the last two simulation steps
+        alpha = self.accumulator / SIMULATION_STEP if INTERPOLATE_RENDERING else 1.0
+        self.renderer.mark_all(self.insects.draw(queue["insects"], alpha))
+        # draw the hands
+        for player, hand in enumerate(self.hands):
+            if self.player_visible(player):
+                self.renderer.mark(hand.draw(queue["hand"]))
+        # draw the score
+        if self.players == 1:
+            self.renderer.mark(
+                ui.draw_counter(
+                    queue["hud"],
+                    "Score : ",
+                    self.score,
+                    (5, 5),
+                    COLORS["score"],
+                    shadow=True,
+                    shadow_color=(255, 255, 255),
+                )
+            )
+        else:
+            self.draw_players(queue["hud"])
         # draw the time left
         timer_text_color = (
             (160, 40, 0) if self.time_left < 5 else COLORS["timer"]
         )  # change the text color if less than 5 s left
-        ui.draw_text(
-            self.surface,
-            f"Time left : {self.time_left}",
-            (self.window_size[0] // 2, 5),
-            timer_text_color,
-            shadow=True,
-            shadow_color=(255, 255, 255),
-        )
-
-        # Draw game over screen if time is up
-        if self.time_left <= 0:
-            if not self.score_saved:
-                self.update_scores(self.score)
-                self.score_saved = True
-            # Create blurred background
-            blurred = self.create_blur_surface(self.surface.copy())
-            self.surface.blit(blurred, (0, 0))
-
-            # Draw Game Over title
-            ui.draw_title_text(
-                self.surface,
-                "GAME OVER",
-                color="white",
-                x=self.window_size[0] // 2,
-                y=250,
-            )
-
-            # Draw final score
-            ui.draw_text(
-                self.surface,
-                f"Final Score: {self.score}",
-                (self.window_size[0] // 2, 350),
-                "white",
-                pos_mode="center",
+        self.renderer.mark(
+            ui.draw_counter(
+                queue["hud"],
+                "Time left : ",
+                self.time_left,
+                (self.window_size[0] // 2, 5),
+                timer_text_color,
                 shadow=True,
                 shadow_color=(255, 255, 255),
             )
-
-    def game_time_update(self):
-        if not self.paused:  # Only update time if game is not paused
-            self.time_left = max(
-                round(GAME_DURATION - (time.time() - self.game_start_time), 1), 0
-            )
-
-    def update_scores(self, score):
-        new_score = {
-            "player_name": self.player_name,
-            "score": score,
-        }
-
-        try:
-            response = requests.post(
-                "https://ozgeldi.tech/api/isjo",
-                json=new_score,
-                headers={"Content-Type": "application/json"},
-                timeout=5,
+        )
+        queue.flush(self.surface)
+
+        if DRAW_HITBOX:  # over the sprites
+            self.insects.draw_hitboxes(self.surface)
+            for hand in self.hands:
+                hand.draw_hitbox(self.surface)
+
+    def hud_bottom(self):  # the first free line under the scores, for the FPS and profiler
+        if self.players == 1:
+            return 70
+        return 5 + self.players * 50
+
+    def draw_players(self, surface):  # a score per player, and a tag over each hand
+        for player, hand in enumerate(self.hands):
+            color = COLORS["players"][player]
+            self.renderer.mark(
+                ui.draw_counter(
+                    surface,
+                    f"P{player + 1} : ",
+                    self.scores[player],
+                    (5, 5 + player * 50),
+                    color,
+                    font=FONTS["small"],
+                    shadow=True,
+                    shadow_color=(255, 255, 255),
+                )
             )
-            response.raise_for_status()
-
-            print(f"[{datetime.datetime.now()}] {self.player_name} - {self.score}. Sent to API successfully")
-        except Exception as e:
-            print(f"Failed to send score to API: {e}")
-
-    def create_blur_surface(self, surface):
-        # Create a copy of the surface at 1/4 size
-        small = pygame.transform.scale(
-            surface, (self.window_size[0] // 4, self.window_size[1] // 4)
+            if self.player_visible(player):
+                self.renderer.mark(
+                    ui.draw_text(
+                        surface,
+                        f"P{player + 1}",
+                        (hand.rect.centerx, hand.rect.top - 30),
+                        color,
+                        font=FONTS["small"],
+                        pos_mode="center",
+                        shadow=True,
+                        shadow_color=(255, 255, 255),
+                    )
+                )
+
+    def game_time_update(self):  # the simulation time only moves while playing
+        self.time_left = max(round(GAME_DURATION - self.sim_time, 1), 0)
+
+    def advance_simulation(self):  # run the fixed steps that fit in the time since the last frame
+        now = time.time()
+        # a long stall only costs MAX_SIMULATION_STEPS steps, the rest is dropped
+        elapsed = min(now - self.last_frame_time, SIMULATION_STEP * MAX_SIMULATION_STEPS)
+        self.last_frame_time = now
+        if self.paused or self.time_left <= 0:
+            return
+
+        # the hand follows the tracking once per frame, the steps use its last position
+        for player, hand in enumerate(self.hands):
+            hand.rect.center = self.get_hand_position(player)
+            hand.set_closed(self.hand_tracking.hands[player].closed)
+
+        self.accumulator += elapsed
+        while self.accumulator >= SIMULATION_STEP and self.time_left > 0:
+            self.accumulator -= SIMULATION_STEP
+            self.simulation_step()
+
+    def simulation_step(self):
+        self.sim_time += SIMULATION_STEP
+        self.animation.update(self.sim_time)  # the time only moves here
+        self.game_time_update()
+        self.spawn_insects()
+        self.scores = kill_insects(self.hands, self.insects, self.scores, self.sounds)
+        self.score = sum(self.scores)
+        self.insects.move()
+        self.insects.cull(self.window_size)
+
+    def update_scores(self):  # saved to the outbox and sent in the background
+        if self.players == 1:
+            self.score_submitter.submit(self.player_name, self.score)
+            return
+        for player, score in enumerate(self.scores):
+            if self.hand_tracking.hands[player].seen:  # only the players who played
+                self.score_submitter.submit(f"{self.player_name} P{player + 1}", score)
+
+    def score_text(self, label):
+        if self.players == 1:
+            return f"{label}: {self.score}"
+        return "   ".join(
+            f"P{player + 1}: {score}" for player, score in enumerate(self.scores)
         )
-        # Scale back up - this creates the blur effect
-        blurred = pygame.transform.scale(small, self.window_size)
-        # Add semi-transparent overlay to darken
-        overlay = pygame.Surface(self.window_size, pygame.SRCALPHA)
-        overlay.fill((0, 0, 0, 128))  # black with 50% transparency
-        blurred.blit(overlay, (0, 0))
-        return blurred
+
+    def close(self):
+        self.warmup.finished.wait()  # never release what is still being opened
+        if self.camera is not None:
+            self.camera.release()
+        if self.recorder is not None:
+            self.recorder.close()
+        if self.owns_submitter:
+            self.score_submitter.close()
+        if self.hand_tracking is not None:
+            self.hand_tracking.close()
 
     def update(self):
-        self.load_camera()
-        self.set_hand_position()
         self.game_time_update()
-
-        # Draw the game normally first
-        self.draw()
+        # the pause and game over screens show a still backdrop, the camera is not read
+        # or scanned behind them
+        if not self.paused and self.time_left > 0:
+            if self.overlay_shown:  # the hands moved while nobody was looking
+                for hand_filter in self.hand_filters:
+                    hand_filter.reset()
+            self.update_camera()
+        self.advance_simulation()
+        profiler.mark("simulation")
+
+        if self.time_left <= 0 and not self.score_saved:
+            self.update_scores()
+            self.score_saved = True
+
+        overlay = "paused" if self.paused else "game over" if self.time_left <= 0 else None
+        if overlay is None:
+            if self.overlay_shown:  # back to the game, the backdrop covers the whole window
+                self.renderer.request_full_redraw()
+                self.backdrop.clear()
+            self.overlay_shown = False
+            self.draw()
+            profiler.mark("draw")
+            return None
+        self.overlay_shown = True
+        self.draw_backdrop(overlay)
 
         if self.paused:
-            # Create blurred background from current display
-            blurred = self.create_blur_surface(self.surface.copy())
-            # Draw the blurred background
-            self.surface.blit(blurred, (0, 0))
+            if self.overlay_button(400, "Continue"):
+                self.paused = False
+                return None
+
+            if self.overlay_button(400 + BUTTONS_SIZES[1] * 1.25, "Main Menu"):
+                self.menu.reset_input()
+                return "menu"
+
+            return None
+
+        # Add Play Again button
+        if self.overlay_button(450, "Play Again"):
+            self.reset()
+            return None
 
+        if self.overlay_button(550, "Main Menu"):
+            self.menu.reset_input()
+            return "menu"
+
+    def draw_backdrop(self, overlay):  # the blurred game, built when the screen is entered
+        blur_scale = self.governor.quality["blur_scale"]
+        key = (overlay, self.window_size, blur_scale)
+        if self.backdrop.key != key:
+            # Draw the game normally first
+            self.renderer.request_full_redraw()
+            self.draw()
+            profiler.mark("draw")
+            self.backdrop.build(self.surface, key, blur_scale)
+            self.draw_overlay_text(self.backdrop.image, overlay)
+            profiler.mark("blur")
+        # only the buttons change from one frame to the next
+        self.renderer.begin(self.surface, self.backdrop)
+
+    def draw_overlay_text(self, surface, overlay):
+        if overlay == "paused":
             # Draw pause menu
             ui.draw_title_text(
-                self.surface, "PAUSED", color="white", x=self.window_size[0] // 2, y=300
+                surface, "PAUSED", color="white", x=self.window_size[0] // 2, y=300
             )
             ui.draw_text(
-                self.surface,
-                f"Current Score: {self.score}",
+                surface,
+                self.score_text("Current Score"),
                 (self.window_size[0] // 2, 360),
                 "white",
+                font=None if self.players == 1 else FONTS["small"],
                 pos_mode="center",
                 shadow=True,
                 shadow_color=(255, 255, 255),
             )
+            return
+
+        # Draw Game Over title
+        ui.draw_title_text(
+            surface,
+            "GAME OVER",
+            color="white",
+            x=self.window_size[0] // 2,
+            y=250,
+        )
 
-            if ui.button(
-                self.surface,
-                400,
-                "Continue",
-                click_sound=self.sounds["slap"],
-                pos_x=self.window_size[0],
-            ):
-                self.paused = False
-                return None
-
-            if ui.button(
-                self.surface,
-                400 + BUTTONS_SIZES[1] * 1.25,
-                "Main Menu",
-                click_sound=self.sounds["slap"],
-                pos_x=self.window_size[0],
-            ):
-                self.menu.reset_input()
-                return "menu"
-
-            return None
-
-        if self.time_left > 0:
-            self.spawn_insects()
-            (x, y) = self.hand_tracking.get_hand_center()
-            self.hand.rect.center = (x, y)
-            self.hand.left_click = self.hand_tracking.hand_closed
-            if self.hand.left_click:
-                self.hand.image = self.hand.image_smaller.copy()
-            else:
-                self.hand.image = self.hand.orig_image.copy()
-            self.score = self.hand.kill_insects(self.insects, self.score, self.sounds)
-            for insect in self.insects:
-                insect.move()
-        else:
-            # Add Play Again button
-            if ui.button(
-                self.surface,
-                450,
-                "Play Again",
-                click_sound=self.sounds["slap"],
-                pos_x=self.window_size[0],
-            ):
-                self.reset()
-                return None
+        # Draw final score
+        ui.draw_text(
+            surface,
+            self.score_text("Final Score"),
+            (self.window_size[0] // 2, 350),
+            "white",
+            font=None if self.players == 1 else FONTS["small"],
+            pos_mode="center",
+            shadow=True,
+            shadow_color=(255, 255, 255),
+        )
 
-            if ui.button(
-                self.surface,
-                550,
-                "Main Menu",
-                click_sound=self.sounds["slap"],
-                pos_x=self.window_size[0],
-            ):
-                self.menu.reset_input()
-                return "menu"
+    def overlay_button(self, pos_y, text):
+        self.renderer.mark(ui.button_area(pos_y, self.window_size[0]))
+        return ui.button(
+            self.surface,
+            pos_y,
+            text,
+            click_sound=self.sounds["slap"],
+            pos_x=self.window_size[0],
+        )
@@ -0,0 +1,50 @@
+import time
+
+from settings import *
+
+
+class QualityGovernor:  # trades quality for frame time, one level at a time
+    def __init__(self, levels=QUALITY_LEVELS, enabled=QUALITY_GOVERNOR):
+        self.levels = levels
+        self.enabled = enabled
+        self.level = 0
+        self.quality = levels[0]
+        self.load = 0.0  # smoothed work time, as a share of the frame budget
+        self.changed_at = time.perf_counter()
+        self.upgrade_hold = GOVERNOR_UPGRADE_HOLD
+        self.upgraded = False  # the last change was a step up
+
+    def update(self, work_time):  # once per frame, return True when the level changed
+        if not self.enabled:
+            return False
+        budget = 1 / self.quality["fps"]
+        self.load += (work_time / budget - self.load) * GOVERNOR_SMOOTHING
+        now = time.perf_counter()
+        held = now - self.changed_at
+
+        if (
+            self.load > GOVERNOR_DOWNGRADE_LOAD
+            and held > GOVERNOR_DOWNGRADE_HOLD
+            and self.level < len(self.levels) - 1
+        ):
+            # back down soon after a step up: that level was too much, wait longer next time
+            if self.upgraded and held < self.upgrade_hold * 2:
+                self.upgrade_hold = min(self.upgrade_hold * 2, GOVERNOR_MAX_UPGRADE_HOLD)
+            self.set_level(self.level + 1, now)
+            self.upgraded = False
+            return True
+
+        if self.level > 0 and held > self.upgrade_hold:
+            better_budget = 1 / self.levels[self.level - 1]["fps"]
+            if self.load * budget / better_budget < GOVERNOR_UPGRADE_LOAD:
+                self.set_level(self.level - 1, now)
+                self.upgraded = True
+                return True
+        return False
+
+    def set_level(self, level, now):
+        old_budget = 1 / self.quality["fps"]
+        self.level = level
+        self.quality = self.levels[level]
+        self.load *= old_budget * self.quality["fps"]  # same work, new budget
+        self.changed_at = now
@@ -7,11 +7,22 @@ from settings import *
 class Hand:
     def __init__(self, window_size):
         self.window_size = window_size
-        self.orig_image = image.load("assets/hand.png", size=(HAND_SIZE, HAND_SIZE))
-        self.image = self.orig_image.copy()
-        self.image_smaller = image.load(
+        self.orig_image = image.load_cached(
+            "assets/hand.png", size=(HAND_SIZE, HAND_SIZE)
+        )
+        self.image_smaller = image.load_cached(
             "assets/hand.png", size=(HAND_SIZE - 50, HAND_SIZE - 50)
         )
+        # from the center to the top left corner of each image, measured once
+        self.offsets = {
+            False: (-self.orig_image.get_width() // 2, -self.orig_image.get_height() // 2),
+            True: (
+                -self.image_smaller.get_width() // 2,
+                -self.image_smaller.get_height() // 2,
+            ),
+        }
+        self.image = self.orig_image
+        self.offset = self.offsets[False]
         self.rect = pygame.Rect(
             self.window_size[0] // 2,
             self.window_size[1] // 2,
@@ -20,6 +31,11 @@ class Hand:
         )
         self.left_click = False
 
+    def set_closed(self, closed):  # a closed hand slaps, and looks smaller
+        self.left_click = closed
+        self.image = self.image_smaller if closed else self.orig_image
+        self.offset = self.offsets[closed]
+
     def follow_mouse(self):  # change the hand pos center at the mouse pos
         self.rect.center = pygame.mouse.get_pos()
 
@@ -29,27 +45,34 @@ class Hand:
     def draw_hitbox(self, surface):
         pygame.draw.rect(surface, (200, 60, 0), self.rect)
 
-    def draw(self, surface):
-        image.draw(surface, self.image, self.rect.center, pos_mode="center")
-
-        if DRAW_HITBOX:
-            self.draw_hitbox(surface)
+    def draw(self, surface):  # surface can be a layer of the RenderQueue
+        return surface.blit(
+            self.image, (self.rect.centerx + self.offset[0], self.rect.centery + self.offset[1])
+        )
 
     def on_insect(
         self, insects
-    ):  # return a list with all insects that collide with the hand hitbox
-        return [insect for insect in insects if self.rect.colliderect(insect.rect)]
+    ):  # return the indices of all insects that collide with the hand hitbox
+        return insects.colliding(self.rect)
 
     def kill_insects(
         self, insects, score, sounds
     ):  # will kill the insects that collide with the hand when the left mouse button is pressed
-        if self.left_click:  # if left click
-            for insect in self.on_insect(insects):
-                insect_score = insect.kill(insects)
-                score += insect_score
-                sounds["slap"].play()
-                if insect_score < 0:
-                    sounds["screaming"].play()
-        else:
-            self.left_click = False
-        return score
+        return kill_insects([self], insects, [score], sounds)[0]
+
+
+def kill_insects(hands, insects, scores, sounds):
+    # the insects under every closed hand, in one collision pass for all the players;
+    # an insect under several hands goes to the nearest one
+    closed = [player for player, hand in enumerate(hands) if hand.left_click]
+    if not closed:
+        return scores
+    indices, owners = insects.colliding_rects([hands[player].rect for player in closed])
+    # highest index first, so removing one does not move the others
+    for index, owner in zip(indices[::-1].tolist(), owners[::-1].tolist()):
+        insect_score = insects.kill(index)
+        scores[closed[owner]] += insect_score
+        sounds["slap"].play()
+        if insect_score < 0:
+            sounds["screaming"].play()
+    return scores
@@ -0,0 +1,57 @@
+import math
+import time
+
+from settings import *
+
+
+def _smoothing(cutoff, dt):  # weight of the new sample for a low-pass at `cutoff` Hz
+    r = 2 * math.pi * cutoff * dt
+    return r / (r + 1)
+
+
+class HandFilter:  # One-Euro smoothing, then extrapolation over the pipeline latency
+    def __init__(
+        self,
+        min_cutoff=HAND_FILTER_MIN_CUTOFF,
+        beta=HAND_FILTER_BETA,
+        d_cutoff=HAND_FILTER_D_CUTOFF,
+    ):
+        self.min_cutoff = min_cutoff  # Hz, smoothing of a still hand (lower is smoother)
+        self.beta = beta  # how fast the smoothing opens up with speed (higher lags less)
+        self.d_cutoff = d_cutoff  # Hz, smoothing of the speed estimate
+        self.reset()
+
+    def reset(self):
+        self.x = self.y = None
+        self.vx = self.vy = 0.0  # px/s
+        self.time = None  # capture time of the last measurement
+
+    def update(self, x, y, t=None):  # a measurement of the frame captured at time t
+        if t is None:  # capture time unknown, assume it is fresh
+            t = time.perf_counter()
+        if self.x is None or t - self.time > HAND_FILTER_RESET_TIME:  # a new hand
+            self.x, self.y, self.time = x, y, t
+            self.vx = self.vy = 0.0
+            return
+        dt = t - self.time
+        if dt <= 0:  # the same result again, nothing new
+            return
+        a = _smoothing(self.d_cutoff, dt)
+        self.vx += a * ((x - self.x) / dt - self.vx)
+        self.vy += a * ((y - self.y) / dt - self.vy)
+        # fast hands are followed closely, slow ones smoothed
+        cutoff = self.min_cutoff + self.beta * math.hypot(self.vx, self.vy)
+        a = _smoothing(cutoff, dt)
+        self.x += a * (x - self.x)
+        self.y += a * (y - self.y)
+        self.time = t
+
+    def position(self, now=None):  # where the hand should be now, None before any measurement
+        if self.x is None:
+            return None
+        if now is None:
+            now = time.perf_counter()
+        # the result is as old as its frame; late results keep moving the hand for a
+        # little while, then it stops instead of running away
+        lead = min(max(now - self.time, 0), HAND_PREDICTION_MAX)
+        return int(self.x + self.vx * lead), int(self.y + self.vy * lead)
@@ -1,5 +1,7 @@
 import cv2
 import mediapipe as mp
+import numpy as np
+from mediapipe.framework.formats import landmark_pb2
 
 from settings import *
 
@@ -8,56 +10,265 @@ mp_drawing_styles = mp.solutions.drawing_styles
 mp_hands = mp.solutions.hands
 
 
-class HandTracking:
-    def __init__(self, window_size):
-        self.window_size = window_size
-        self.hand_tracking = mp_hands.Hands(
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5,
-            max_num_hands=1,  # Only track one hand to improve performance
-            model_complexity=0,  # Use a lighter model (0 is fastest, 1 is balanced, 2 is most accurate)
+def _rgb_style(style):  # the default styles are BGR, the frames we draw on are RGB
+    return {
+        key: mp_drawing.DrawingSpec(
+            color=spec.color[::-1],
+            thickness=spec.thickness,
+            circle_radius=spec.circle_radius,
         )
-        self.hand_x = 0
-        self.hand_y = 0
+        for key, spec in style.items()
+    }
+
+
+LANDMARKS_STYLE = _rgb_style(mp_drawing_styles.get_default_hand_landmarks_style())
+CONNECTIONS_STYLE = _rgb_style(mp_drawing_styles.get_default_hand_connections_style())
+
+
+def create_hands_model(max_hands=1):
+    return mp_hands.Hands(
+        min_detection_confidence=0.5,
+        min_tracking_confidence=0.5,
+        max_num_hands=max_hands,  # one per player, a single hand is the fastest
+        model_complexity=0,  # Use a lighter model (0 is fastest, 1 is balanced, 2 is most accurate)
+    )
+
+
+class HandDetector:  # MediaPipe on the whole frame, or on a crop around the last hand
+    def __init__(self, roi=HAND_TRACKING_ROI, max_hands=1):
+        self.max_hands = max_hands
+        self.hands = create_hands_model(max_hands)
+        # the crops get their own model, its tracking state is in crop coordinates;
+        # a crop follows one hand, so several players always scan the whole frame
+        self.roi_hands = create_hands_model() if roi and max_hands == 1 else None
+        self.roi = None  # (x0, y0, x1, y1) of the crop, normalized in the mirrored frame
+        self.roi_misses = 0
+        self.roi_wait = 0  # frames left before the next try after the crop lost the hand
         self.results = None
-        self.hand_closed = False
+        w, h = ROI_INPUT_SIZE
+        self.roi_small = np.empty((h, w, 3), dtype=np.uint8)
+        self.roi_flipped = np.empty((h, w, 3), dtype=np.uint8)
+        self.roi_image = np.empty((h, w, 3), dtype=np.uint8)
 
-    def scan_hands(self, image):
-        # Reduce image resolution for processing
-        image = cv2.resize(image, (300, 169))  # Lower resolution for processing
+    def process(self, image, source=None):  # return the landmarks of the first hand or None
+        # image is the mirrored RGB frame, source the camera frame it was made from
+        # (BGR, not mirrored, full resolution): the crops are taken from it when given
+        frame = image if source is None else source
+        if self.roi is not None:
+            hand_landmarks = self.process_roi(image, source)
+            if hand_landmarks is not None:
+                self.roi_misses = 0
+                self.set_roi(hand_landmarks, frame)
+                return hand_landmarks
+            # lost: detect on the whole frame again, and back off before the next crop
+            # so a hand the crop keeps missing does not cost two inferences per frame
+            self.roi = None
+            self.roi_hands.reset()
+            self.roi_misses += 1
+            self.roi_wait = min(2**self.roi_misses, 32)
 
-        image = cv2.cvtColor(cv2.flip(image, 1), cv2.COLOR_BGR2RGB)
         image.flags.writeable = False
-        self.results = self.hand_tracking.process(image)
+        self.results = self.hands.process(image)
         image.flags.writeable = True
-        image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+        if not self.results.multi_hand_landmarks:
+            return None
+        hand_landmarks = self.results.multi_hand_landmarks[0]  # Only process first hand
+        if self.roi_hands is not None:
+            if self.roi_wait:
+                self.roi_wait -= 1
+            else:
+                self.set_roi(hand_landmarks, frame)
+        return hand_landmarks
 
-        self.hand_closed = False
+    def process_hands(self, image, source=None):  # return the landmarks of every hand
+        if self.max_hands == 1:
+            hand_landmarks = self.process(image, source)
+            return [] if hand_landmarks is None else [hand_landmarks]
+        image.flags.writeable = False
+        self.results = self.hands.process(image)
+        image.flags.writeable = True
+        return list(self.results.multi_hand_landmarks or [])
 
-        if self.results.multi_hand_landmarks:
-            hand_landmarks = self.results.multi_hand_landmarks[
-                0
-            ]  # Only process first hand
-            x, y = hand_landmarks.landmark[9].x, hand_landmarks.landmark[9].y
+    def set_roi(self, hand_landmarks, frame):  # a padded square around the hand
+        h, w = frame.shape[:2]
+        xs = [landmark.x for landmark in hand_landmarks.landmark]
+        ys = [landmark.y for landmark in hand_landmarks.landmark]
+        side = max((max(xs) - min(xs)) * w, (max(ys) - min(ys)) * h) * (1 + 2 * ROI_PADDING)
+        side = min(max(side, 16), w, h)
+        half_x, half_y = side / 2 / w, side / 2 / h
+        # keep the whole square inside the frame
+        x = min(max((min(xs) + max(xs)) / 2, half_x), 1 - half_x)
+        y = min(max((min(ys) + max(ys)) / 2, half_y), 1 - half_y)
+        self.roi = (x - half_x, y - half_y, x + half_x, y + half_y)
 
-            self.hand_x = int(x * (self.window_size[0] + 400)) - 200
-            self.hand_y = int(y * (self.window_size[1] + 400)) - 200
+    def process_roi(self, image, source):
+        x0, y0, x1, y1 = self.roi
+        if source is None:
+            h, w = image.shape[:2]
+            crop = image[int(y0 * h) : int(y1 * h), int(x0 * w) : int(x1 * w)]
+            cv2.resize(crop, ROI_INPUT_SIZE, dst=self.roi_image)
+        else:
+            # the source is not mirrored yet: crop at 1 - x, then mirror the crop only
+            h, w = source.shape[:2]
+            crop = source[int(y0 * h) : int(y1 * h), int((1 - x1) * w) : int((1 - x0) * w)]
+            cv2.resize(crop, ROI_INPUT_SIZE, dst=self.roi_small)
+            cv2.flip(self.roi_small, 1, dst=self.roi_flipped)
+            cv2.cvtColor(self.roi_flipped, cv2.COLOR_BGR2RGB, dst=self.roi_image)
+
+        self.roi_image.flags.writeable = False
+        results = self.roi_hands.process(self.roi_image)
+        self.roi_image.flags.writeable = True
+        if not results.multi_hand_landmarks:
+            return None
+        hand_landmarks = results.multi_hand_landmarks[0]
+        for landmark in hand_landmarks.landmark:  # back to whole frame coordinates
+            landmark.x = x0 + landmark.x * (x1 - x0)
+            landmark.y = y0 + landmark.y * (y1 - y0)
+        return hand_landmarks
+
+    def reset(self):
+        self.roi = None
+        self.roi_misses = 0
+        self.roi_wait = 0
+        self.hands.reset()
+        if self.roi_hands is not None:
+            self.roi_hands.reset()
+
+    def close(self):
+        self.hands.close()
+        if self.roi_hands is not None:
+            self.roi_hands.close()
+
+
+class TrackedHand:  # the hand of one player, matched to the nearest hand of each scan
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.x = 0
+        self.y = 0
+        self.closed = False
+        self.landmarks = None
+        self.found = False  # x and y come from the last result
+        self.seen = False  # found at least once this round
+        self.missed = 0  # results since it was last found
+
+
+class _FirstHand:  # an attribute of the first player's hand, all a single player uses
+    def __init__(self, name):
+        self.name = name
+
+    def __get__(self, tracking, owner=None):
+        if tracking is None:
+            return self
+        return getattr(tracking.hands[0], self.name)
+
+    def __set__(self, tracking, value):
+        setattr(tracking.hands[0], self.name, value)
 
-            x1, y1 = hand_landmarks.landmark[12].x, hand_landmarks.landmark[12].y
 
-            if y1 > y:
-                self.hand_closed = True
+class HandTracking:  # start() once, reset() every round, close() on quit
+    hand_x = _FirstHand("x")
+    hand_y = _FirstHand("y")
+    hand_closed = _FirstHand("closed")
+    hand_landmarks = _FirstHand("landmarks")
+    hand_found = _FirstHand("found")
+    fixed_frame_size = False  # the quality governor can change the size of the frames
 
-            # Only draw landmarks if FPS is above threshold
-            if DRAW_FPS:
-                mp_drawing.draw_landmarks(
-                    image,
+    def __init__(self, window_size, players=PLAYERS):
+        self.window_size = window_size
+        self.hands = [TrackedHand() for _ in range(players)]
+        self.hand_tracking = None
+        self.landmarks_overlay = DRAW_LANDMARKS  # lowered by the quality governor
+        self.reset()
+
+    def start(self):  # load the model, once for the whole session
+        if self.hand_tracking is None:
+            self.hand_tracking = HandDetector(max_hands=len(self.hands))
+
+    def reset(self):  # forget the hands of the previous round, keep the model
+        for hand in self.hands:
+            hand.reset()
+        self.results = None
+        self.result_time = None  # capture time of the frame the landmarks came from
+        if self.hand_tracking is not None:
+            self.hand_tracking.reset()  # drop the tracked hand region, takes a few ms
+
+    def scan_hands(self, image, source=None, timestamp=None):
+        # image is the mirrored RGB frame from the FramePipeline, source the camera frame
+        # and timestamp the time it was captured
+        self.update_hands(self.hand_tracking.process_hands(image, source))
+        self.results = self.hand_tracking.results
+        self.result_time = timestamp
+        self.draw_hands(image)
+        return image
+
+    def update_hand(self, hand_landmarks):  # a result with at most one hand
+        self.update_hands([] if hand_landmarks is None else [hand_landmarks])
+
+    def update_hands(self, hands_landmarks):
+        found = []
+        for hand_landmarks in hands_landmarks:
+            x, y = hand_landmarks.landmark[9].x, hand_landmarks.landmark[9].y
+            x1, y1 = hand_landmarks.landmark[12].x, hand_landmarks.landmark[12].y
+            found.append(
+                (
+                    int(x * (self.window_size[0] + 400)) - 200,
+                    int(y * (self.window_size[1] + 400)) - 200,
+                    y1 > y,  # the middle finger is folded
                     hand_landmarks,
-                    mp_hands.HAND_CONNECTIONS,
-                    mp_drawing_styles.get_default_hand_landmarks_style(),
-                    mp_drawing_styles.get_default_hand_connections_style(),
                 )
-        return image
+            )
+
+        # each player takes the nearest hand close enough to theirs, closest pairs first;
+        # the hands left go to the players never seen, then to those lost the longest
+        pairs = sorted(
+            (
+                (hand.x - x) ** 2 + (hand.y - y) ** 2 if hand.seen else float("inf"),
+                player,
+                i,
+            )
+            for player, hand in enumerate(self.hands)
+            for i, (x, y, _, _) in enumerate(found)
+        )
+        matches = {}
+        for distance, player, i in pairs:
+            if distance > PLAYER_MATCH_DISTANCE**2:
+                break
+            if player not in matches and i not in matches.values():
+                matches[player] = i
+        free = sorted(
+            (self.hands[player].seen, -self.hands[player].missed, distance, player, i)
+            for distance, player, i in pairs
+        )
+        for _, _, _, player, i in free:
+            if player not in matches and i not in matches.values():
+                matches[player] = i
+
+        for player, hand in enumerate(self.hands):
+            hand.closed = False
+            hand.landmarks = None
+            hand.found = player in matches
+            if hand.found:
+                hand.x, hand.y, hand.closed, hand.landmarks = found[matches[player]]
+                hand.seen = True
+                hand.missed = 0
+            else:
+                hand.missed += 1
+
+    def draw_hands(self, image):
+        for hand in self.hands:
+            self.draw_landmarks(image, hand.landmarks)
+
+    def draw_landmarks(self, image, hand_landmarks):
+        if self.landmarks_overlay and hand_landmarks is not None:
+            mp_drawing.draw_landmarks(
+                image,
+                hand_landmarks,
+                mp_hands.HAND_CONNECTIONS,
+                LANDMARKS_STYLE,
+                CONNECTIONS_STYLE,
+            )
 
     def get_hand_center(self):
         return (self.hand_x, self.hand_y)
@@ -65,3 +276,15 @@ class HandTracking:
     def display_hand(self):
         cv2.imshow("image", self.image)
         cv2.waitKey(1)
+
+    def close(self):
+        if self.hand_tracking is not None:
+            self.hand_tracking.close()
+            self.hand_tracking = None
+
+
+def landmarks_from_points(points):  # build a landmark list from (x, y) pairs
+    hand_landmarks = landmark_pb2.NormalizedLandmarkList()
+    for x, y in points:
+        hand_landmarks.landmark.add(x=float(x), y=float(y))
+    return hand_landmarks
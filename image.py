@@ -1,5 +1,11 @@
+from collections import OrderedDict
+
 import pygame
 
+from settings import *
+
+_sprite_cache = OrderedDict()  # (path, size, flip) -> surface, least recently used first
+
 
 def load(img_path, size="default", convert="alpha", flip=False):
     if convert == "alpha":
@@ -20,10 +26,47 @@ def scale(img, size):
     return pygame.transform.smoothscale(img, size)
 
 
+def quantise_size(size):  # round to SPRITE_SIZE_STEP so close sizes share a sprite
+    return tuple(
+        max(SPRITE_SIZE_STEP, round(value / SPRITE_SIZE_STEP) * SPRITE_SIZE_STEP)
+        for value in size
+    )
+
+
+def load_cached(img_path, size="default", flip=False):
+    # the returned surface is shared, never draw on it
+    if size != "default":
+        size = quantise_size(size)
+    key = (img_path, size, flip)
+    img = _sprite_cache.get(key)
+    if img is not None:
+        _sprite_cache.move_to_end(key)
+        return img
+
+    if size == "default" and not flip:
+        img = load(img_path)
+    else:  # build from the cached decoded image instead of reading the file again
+        img = load_cached(img_path)
+        if flip:
+            img = pygame.transform.flip(img, True, False)
+        if size != "default":
+            img = scale(img, size)
+
+    _sprite_cache[key] = img
+    if len(_sprite_cache) > SPRITE_CACHE_SIZE:
+        _sprite_cache.popitem(last=False)
+    return img
+
+
+def prewarm(sprites):  # load a list of (path, size, flip) into the cache
+    for img_path, size, flip in sprites:
+        load_cached(img_path, size, flip)
+
+
 def draw(surface, img, pos, pos_mode="top_left"):
     if pos_mode == "center":
         pos = list(pos)
         pos[0] -= img.get_width() // 2
         pos[1] -= img.get_height() // 2
 
-    surface.blit(img, pos)
+    return surface.blit(img, pos)
@@ -0,0 +1,108 @@
+import json
+import os
+import threading
+import time
+
+import api
+from settings import *
+
+
+class LeaderboardFetcher:
+    def __init__(self, url=API_URL, snapshot_path=LEADERBOARD_SNAPSHOT_PATH):
+        self.url = url
+        self.snapshot_path = snapshot_path
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.fetched_at = 0
+        self.fetching = False
+        self.failed = False
+        self.etag = None
+        self.last_modified = None
+        self.data = None
+        self.data_lines = None
+        self.load_snapshot()  # the last known leaderboard shows instantly
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def load_snapshot(self):
+        try:
+            with open(self.snapshot_path) as file:
+                snapshot = json.load(file)
+        except (OSError, ValueError):
+            return
+        self.etag = snapshot.get("etag")
+        self.last_modified = snapshot.get("last_modified")
+        self.set_data(snapshot.get("data"))
+
+    def set_data(self, data):
+        self.data = data
+        if data is not None:
+            self.data_lines = [
+                f"{index + 1}. {item['player_name']}: {item['score']}"
+                for index, item in enumerate(data)
+            ]
+
+    def save_snapshot(self):
+        snapshot = {
+            "etag": self.etag,
+            "last_modified": self.last_modified,
+            "data": self.data,
+        }
+        tmp_path = self.snapshot_path + ".tmp"
+        try:
+            with open(tmp_path, "w") as file:
+                json.dump(snapshot, file)
+            os.replace(tmp_path, self.snapshot_path)
+        except OSError as e:
+            print(f"Failed to save the leaderboard: {e}")
+
+    def refresh(self):  # ask for a new fetch if the cached one is too old, never blocks
+        with self.lock:
+            if self.fetching or time.time() - self.fetched_at < LEADERBOARD_TTL:
+                return
+            self.fetching = True
+        self.wake.set()
+
+    def lines(self):
+        with self.lock:
+            if self.data_lines is None:
+                return ["Leaderboard unavailable"] if self.failed else ["Loading..."]
+            return self.data_lines
+
+    def _run(self):
+        while True:
+            self.wake.wait()
+            self.wake.clear()
+            self._fetch()
+            with self.lock:
+                self.fetching = False
+
+    def _fetch(self):
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        try:
+            response = api.session().get(self.url, headers=headers, timeout=5)
+            if response.status_code == 304:  # the snapshot is still up to date
+                with self.lock:
+                    self.fetched_at = time.time()
+                    self.failed = False
+                return
+            response.raise_for_status()
+            data = response.json()["data"]
+        except Exception as e:
+            print(f"Failed to fetch the leaderboard: {e}")
+            with self.lock:
+                self.failed = True
+                self.fetched_at = time.time() - LEADERBOARD_TTL + LEADERBOARD_RETRY_DELAY
+            return
+
+        with self.lock:
+            self.set_data(data)
+            self.etag = response.headers.get("ETag")
+            self.last_modified = response.headers.get("Last-Modified")
+            self.fetched_at = time.time()
+            self.failed = False
+        self.save_snapshot()
@@ -1,45 +1,27 @@
+import time
+
+launch_time = time.perf_counter()  # the imports below are part of the startup
+
+import multiprocessing
 import os
 import sys
 
 import pygame
 
+import ui
 from game import Game
 from menu import Menu
+from profiler import profiler
+from startup import startup
 from settings import *
 
 
-# Setup pygame/window --------------------------------------------- #
-os.environ["SDL_VIDEO_WINDOW_POS"] = "%d,%d" % (100, 32)
-pygame.init()
-pygame.display.set_caption(WINDOW_NAME)
-
-if FULLSCREEN_MODE:
-    SCREEN = pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
-else:
-    SCREEN = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-
-main_clock = pygame.time.Clock()
-
-
-fps_font = pygame.font.SysFont("coopbl", 22)
-
-
-pygame.mixer.music.load("assets/sounds/music.mp3")
-pygame.mixer.music.set_volume(MUSIC_VOLUME)
-pygame.mixer.music.play(-1)
-
-state = "menu"
-
-
-game = Game(SCREEN, None)
-menu = Menu(SCREEN, game)
-game.menu = menu
-
-
 def user_events():
     global state
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
+            game.close()
+            profiler.close()
             pygame.quit()
             sys.exit()
 
@@ -49,6 +31,8 @@ def user_events():
                     game.paused = (
                         not game.paused
                     )  # Toggle pause state instead of returning to menu
+            if event.key == pygame.K_F3:
+                profiler.toggle_overlay()
 
         if state == "menu":
             menu.handle_event(event)
@@ -61,20 +45,90 @@ def update():
         if menu.update() == "game":
             game.reset()
             state = "game"
+        profiler.mark("menu")
     elif state == "game":
         if game.update() == "menu":
             state = "menu"
-    main_clock.tick(FPS)
-
-
-while True:
-    user_events()
-    update()
-
-    if DRAW_FPS:
-        fps_label = fps_font.render(
-            f"FPS: {int(main_clock.get_fps())}", 1, (255, 200, 20)
-        )
-        SCREEN.blit(fps_label, (5, 70))
-
-    pygame.display.flip()
+        profiler.mark("draw")  # the pause and game over buttons
+    main_clock.tick(game.governor.quality["fps"])
+    profiler.mark("wait")
+    # rawtime is the time the last frame spent working, without the wait; the cheap
+    # pause and game over frames say nothing about what a round costs
+    playing = state == "game" and not game.paused and game.time_left > 0
+    if playing and game.governor.update(main_clock.get_rawtime() / 1000):
+        game.apply_quality()
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()  # hand tracking workers are spawned processes
+    startup.start = launch_time
+    startup.record("imports", launch_time)
+
+    # Setup pygame/window --------------------------------------------- #
+    started = time.perf_counter()
+    os.environ["SDL_VIDEO_WINDOW_POS"] = "%d,%d" % (100, 32)
+    pygame.init()
+    pygame.display.set_caption(WINDOW_NAME)
+
+    if FULLSCREEN_MODE:
+        SCREEN = pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
+    else:
+        SCREEN = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+
+    main_clock = pygame.time.Clock()
+    startup.record("window", started)
+    started = time.perf_counter()
+
+    fps_font = pygame.font.SysFont("coopbl", 22)
+
+    pygame.mixer.music.load("assets/sounds/music.mp3")
+    pygame.mixer.music.set_volume(MUSIC_VOLUME)
+    pygame.mixer.music.play(-1)
+    startup.record("music", started)
+
+    state = "menu"
+
+    # the camera and hand tracking keep loading in the background (Game.warmup)
+    started = time.perf_counter()
+    game = Game(SCREEN, None)
+    menu = Menu(SCREEN, game)
+    game.menu = menu
+    startup.record("game and menu", started)
+    started = time.perf_counter()
+    first_frame = True
+
+    while True:
+        profiler.begin_frame()
+        user_events()
+        profiler.mark("events")
+        update()
+
+        hud_y = game.hud_bottom() if state == "game" else 70
+        if DRAW_FPS:
+            fps_rect = ui.draw_counter(
+                SCREEN,
+                "FPS: ",
+                int(main_clock.get_fps()),
+                (5, hud_y),
+                (255, 200, 20),
+                font=fps_font,
+            )
+            if state == "game":
+                game.renderer.mark(fps_rect)
+
+        profiler_rect = profiler.draw(SCREEN, (5, hud_y + 30))
+        if state == "game":
+            game.renderer.mark(profiler_rect)
+
+        if state == "game":
+            game.renderer.present()
+        else:
+            pygame.display.flip()
+        profiler.mark("present")
+        profiler.end_frame()
+
+        if first_frame:
+            startup.record("first frame", started)
+            first_frame = False
+        if STARTUP_REPORT and not startup.reported and game.warmup.done():
+            startup.report()
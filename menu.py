@@ -2,10 +2,10 @@ import sys
 import time
 
 import pygame
-import requests
 
 import ui
 from background import Background
+from leaderboard import LeaderboardFetcher
 from settings import *
 
 
@@ -20,8 +20,7 @@ class Menu:
         self.input_rect = pygame.Rect(self.window_width // 2 - 300, 240, 600, 50)
         self.border_color = COLORS["buttons"]["default"]
         self.show_leaderboard = False
-        self.leaderboard_fetched = False
-        self.leaderboard_data = []
+        self.leaderboard = LeaderboardFetcher()
         self.show_credits = False
         self.show_settings = False
 
@@ -49,17 +48,10 @@ class Menu:
         self.background.draw(self.surface)
 
         if self.show_leaderboard:
-            if not self.leaderboard_fetched:
-                response = requests.get("https://ozgeldi.tech/api/isjo")
-                raw = response.json()
-                self.leaderboard_fetched = True
-                self.leaderboard_data = [
-                    f"{index + 1}. {item['player_name']}: {item['score']}"
-                    for index, item in enumerate(raw["data"])
-                ]
+            self.leaderboard.refresh()  # fetched in the background, cached meanwhile
             ui.draw_title_text(self.surface, "Leaderboard", x=self.window_width // 2)
             ui.draw_small_texts(
-                self.surface, self.leaderboard_data, x=self.window_width // 2
+                self.surface, self.leaderboard.lines(), x=self.window_width // 2
             )
         elif self.show_credits:
             ui.draw_title_text(self.surface, "Credits", x=self.window_width // 2)
@@ -174,14 +166,16 @@ class Menu:
                 self.show_settings = False
                 return "menu"
         else:
-            # Only enable the Start button if there's a username
+            # Only enable the Start button if there's a username and the camera is ready
+            ready = self.game.warmup.done()
+            can_start = ready and self.player_name.strip()
             if ui.button(
                 self.surface,
                 320,
-                "Start",
-                click_sound=self.click_sound if self.player_name.strip() else None,
+                "Start" if ready else "Loading...",
+                click_sound=self.click_sound if can_start else None,
                 pos_x=self.window_width,
-                disabled=not self.player_name.strip(),
+                disabled=not can_start,
             ):
                 self.game.player_name = self.player_name
                 return "game"
@@ -220,6 +214,7 @@ class Menu:
                 click_sound=self.click_sound,
                 pos_x=self.window_width,
             ):
+                self.game.close()
                 pygame.quit()
                 sys.exit()
 
@@ -0,0 +1,144 @@
+import time
+from collections import deque
+
+import pygame
+
+import ui
+from settings import *
+
+STAGES = (
+    "events",
+    "menu",
+    "camera",
+    "tracking",
+    "draw",
+    "blur",
+    "simulation",
+    "wait",
+    "present",
+)
+STAGE_COLORS = {
+    "events": (180, 180, 180),
+    "menu": (120, 200, 255),
+    "camera": (255, 200, 20),
+    "tracking": (255, 110, 40),
+    "draw": (90, 220, 120),
+    "blur": (200, 120, 255),
+    "simulation": (60, 160, 255),
+    "wait": (90, 90, 90),
+    "present": (255, 80, 160),
+}
+GRAPH_SIZE = (300, 90)
+
+
+class FrameProfiler:
+    def __init__(self, show_overlay=PROFILER_OVERLAY, trace_path=PROFILER_TRACE_PATH):
+        self.show_overlay = show_overlay
+        self.trace = None
+        self.enabled = False
+        self.history = deque(maxlen=GRAPH_SIZE[0] // 2)  # work time of the last frames
+        self.stages = dict.fromkeys(STAGES, 0.0)
+        self.averages = dict.fromkeys(STAGES, 0.0)
+        self.frame_start = self.last_mark = time.perf_counter()
+        self.frame_count = 0
+        self.font = None
+        self.panel = None
+        if trace_path is not None:
+            self.start_trace(trace_path)
+        self.update_enabled()
+
+    def update_enabled(self):  # the marks cost nothing unless someone looks at them
+        self.enabled = self.show_overlay or self.trace is not None
+
+    def toggle_overlay(self):
+        self.show_overlay = not self.show_overlay
+        self.update_enabled()
+
+    def start_trace(self, path):  # one line per frame, JSON lines if the file ends in .jsonl
+        self.trace = open(path, "w")
+        self.trace_jsonl = path.endswith(".jsonl")
+        if not self.trace_jsonl:
+            self.trace.write(",".join(("frame", "time", "total_ms") + STAGES) + "\n")
+        self.update_enabled()
+
+    def close(self):
+        if self.trace is not None:
+            self.trace.close()
+            self.trace = None
+        self.update_enabled()
+
+    def begin_frame(self):
+        if not self.enabled:
+            return
+        self.frame_start = self.last_mark = time.perf_counter()
+        for stage in self.stages:
+            self.stages[stage] = 0.0
+
+    def mark(self, stage):  # the time since the previous mark was spent in this stage
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.stages[stage] += now - self.last_mark
+        self.last_mark = now
+
+    def end_frame(self):
+        if not self.enabled:
+            return
+        total = time.perf_counter() - self.frame_start
+        self.frame_count += 1
+        self.history.append(total - self.stages["wait"])
+        for stage, duration in self.stages.items():
+            self.averages[stage] += (duration - self.averages[stage]) * 0.05
+
+        if self.trace is not None:
+            values = [f"{self.stages[stage] * 1000:.3f}" for stage in STAGES]
+            if self.trace_jsonl:
+                self.trace.write(
+                    f'{{"frame": {self.frame_count}, "time": {self.frame_start:.6f}, '
+                    f'"total_ms": {total * 1000:.3f}, '
+                    + ", ".join(f'"{s}": {v}' for s, v in zip(STAGES, values))
+                    + "}\n"
+                )
+            else:
+                self.trace.write(
+                    f"{self.frame_count},{self.frame_start:.6f},{total * 1000:.3f},"
+                    + ",".join(values)
+                    + "\n"
+                )
+
+    def draw(self, surface, pos):  # rolling frame time graph and average time per stage
+        if not self.show_overlay:
+            return None
+        if self.font is None:
+            self.font = pygame.font.Font(None, 22)
+            height = GRAPH_SIZE[1] + 20 * len(STAGES) + 10
+            self.panel = pygame.Surface((GRAPH_SIZE[0], height), pygame.SRCALPHA)
+            self.panel.fill((0, 0, 0, 160))
+
+        x, y = pos
+        rect = surface.blit(self.panel, pos)
+        w, h = GRAPH_SIZE
+        budget = 1 / FPS
+        scale = h / (budget * 2)  # the graph goes up to two frame budgets
+        budget_y = y + h - int(budget * scale)
+        pygame.draw.line(surface, (160, 40, 0), (x, budget_y), (x + w, budget_y))
+        if len(self.history) > 1:
+            points = [
+                (x + i * 2, y + h - min(h, int(duration * scale)))
+                for i, duration in enumerate(self.history)
+            ]
+            pygame.draw.lines(surface, (255, 255, 255), False, points)
+
+        for i, stage in enumerate(STAGES):
+            ui.draw_counter(
+                surface,
+                f"{stage} ms: ",
+                f"{self.averages[stage] * 1000:.1f}",
+                (x + 5, y + h + 5 + i * 20),
+                STAGE_COLORS[stage],
+                font=self.font,
+            )
+        return rect
+
+
+profiler = FrameProfiler()
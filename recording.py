@@ -0,0 +1,135 @@
+import collections
+import time
+
+import numpy as np
+
+from hand_tracking import HandTracking, landmarks_from_points
+from settings import *
+
+LANDMARKS_COUNT = 21
+NO_HAND = np.full((LANDMARKS_COUNT, 2), np.nan, dtype=np.float32)
+
+# a session is two files next to each other:
+#   <path>.frames  every frame as raw BGR pixels at tracking size, memory-mapped on replay
+#   <path>.npz     frame shape, capture timestamps and the landmarks the game used, one
+#                  slot per player (MAX_PLAYERS of them)
+
+
+class SessionRecorder:
+    def __init__(self, path, frame_size=TRACKING_FRAME_SIZE):
+        self.path = path
+        self.frame_shape = (frame_size[1], frame_size[0], 3)
+        self.frames_file = open(path + ".frames", "wb")
+        self.timestamps = []
+        self.landmarks = []  # (x, y) of every landmark of every player, NaN for no hand
+
+    def record(self, frame, timestamp, hands_landmarks):  # the landmarks of every player
+        self.frames_file.write(np.ascontiguousarray(frame).data)
+        self.timestamps.append(timestamp)
+        players = np.repeat(NO_HAND[None], MAX_PLAYERS, axis=0)
+        for player, hand_landmarks in enumerate(hands_landmarks):
+            if hand_landmarks is not None:
+                players[player] = [
+                    (landmark.x, landmark.y) for landmark in hand_landmarks.landmark
+                ]
+        self.landmarks.append(players)
+
+    def close(self):
+        if self.frames_file.closed:
+            return
+        self.frames_file.close()
+        np.savez(
+            self.path + ".npz",
+            shape=np.array(self.frame_shape),
+            timestamps=np.array(self.timestamps, dtype=np.float64),
+            landmarks=np.array(self.landmarks, dtype=np.float32).reshape(
+                -1, MAX_PLAYERS, LANDMARKS_COUNT, 2
+            ),
+        )
+
+
+class ReplayCapture:  # stands in for cv2.VideoCapture, plays a recorded session
+    def __init__(self, path, realtime=True, loop=False):
+        with np.load(path + ".npz") as index:
+            shape = tuple(int(n) for n in index["shape"])
+            self.timestamps = index["timestamps"]
+            self.landmarks = index["landmarks"]
+        if self.landmarks.ndim == 3:  # recorded before there were several players
+            self.landmarks = self.landmarks[:, None]
+        self.frames = np.memmap(
+            path + ".frames",
+            dtype=np.uint8,
+            mode="r",
+            shape=(len(self.timestamps),) + shape,
+        )
+        self.offsets = self.timestamps - self.timestamps[0] if len(self.timestamps) else []
+        self.realtime = realtime  # keep the recorded pace, else one frame per read
+        self.loop = loop
+        self.position = -1  # index of the last frame handed out
+        # (when, index) of the latest frames handed out; a threaded Camera keeps reading
+        # while the game still holds an older one
+        self.handed_out = collections.deque(maxlen=64)
+        self.start = None
+
+    def __len__(self):
+        return len(self.frames)
+
+    def isOpened(self):
+        return self.frames is not None
+
+    def read(self, image=None):
+        index = self.position + 1
+        if self.realtime:
+            now = time.perf_counter()
+            if self.start is None:
+                self.start = now
+            elapsed = now - self.start
+            # like a live camera: skip the frames that are already late, wait for early ones
+            index = max(index, int(np.searchsorted(self.offsets, elapsed, "right")) - 1)
+            if index < len(self.frames) and self.offsets[index] > elapsed:
+                time.sleep(self.offsets[index] - elapsed)
+
+        if index >= len(self.frames):
+            if not self.loop or not len(self.frames):
+                return False, None
+            self.position = -1
+            self.start = None
+            return self.read(image)
+
+        self.position = index
+        self.handed_out.append((time.perf_counter(), index))
+        if image is None:
+            image = np.array(self.frames[index])
+        else:
+            np.copyto(image, self.frames[index])
+        return True, image
+
+    def frame_index(self, timestamp):  # the frame the Camera stamped with this capture time
+        # the Camera stamps a frame right after read() returns it, so it is the last one
+        # handed out before the timestamp
+        if timestamp is not None:
+            for handed_out, index in reversed(list(self.handed_out)):
+                if handed_out <= timestamp:
+                    return index
+        return self.position
+
+    def release(self):
+        self.frames = None
+
+
+class ReplayHandTracking(HandTracking):  # the recorded landmarks instead of MediaPipe
+    def __init__(self, window_size, capture, players=PLAYERS):
+        super().__init__(window_size, players)
+        self.capture = capture
+
+    def start(self):
+        pass
+
+    def scan_hands(self, image, source=None, timestamp=None):
+        players = self.capture.landmarks[self.capture.frame_index(timestamp)]
+        self.update_hands(
+            [landmarks_from_points(points) for points in players if not np.isnan(points[0, 0])]
+        )
+        self.result_time = timestamp
+        self.draw_hands(image)
+        return image
@@ -0,0 +1,69 @@
+import pygame
+
+from settings import *
+
+
+class DirtyRectRenderer:
+    def __init__(self, enabled=DIRTY_RECT_RENDERING, display=True):
+        self.enabled = enabled
+        self.display = display  # False for an offscreen surface, present() only ends the frame
+        self.full_redraw = True
+        self.previous = []  # what was drawn last frame, to be covered with background
+        self.current = []
+
+    def request_full_redraw(self):
+        self.full_redraw = True
+
+    def begin(self, surface, background):  # clear what changed since the last frame
+        if not self.enabled or self.full_redraw:
+            background.draw(surface)
+        else:
+            for rect in self.previous:
+                surface.blit(background.image, rect, rect)
+
+    def mark(self, rect):  # something was drawn in this rect
+        if rect is not None:
+            self.current.append(rect)
+
+    def mark_all(self, rects):
+        self.current.extend(rects)
+
+    def present(self):
+        if not self.display:
+            self.full_redraw = False
+        elif not self.enabled or self.full_redraw:
+            pygame.display.flip()
+            self.full_redraw = False
+        else:
+            pygame.display.update(self.previous + self.current)
+        self.previous, self.current = self.current, self.previous
+        self.current.clear()
+
+
+RENDER_LAYERS = ("background", "insects", "hand", "hud")  # drawn in this order
+
+
+class RenderLayer:  # stands in for the target surface, keeps the blits for later
+    def __init__(self):
+        self.items = []
+
+    def blit(self, image, pos):  # return the rect it will cover, like Surface.blit
+        self.items.append((image, pos))
+        return pygame.Rect(pos[0], pos[1], *image.get_size())
+
+    def blits(self, sequence):
+        return [self.blit(image, pos) for image, pos in sequence]
+
+
+class RenderQueue:  # the blits of a frame, sent with one Surface.blits per layer
+    def __init__(self, layers=RENDER_LAYERS):
+        self.layers = {name: RenderLayer() for name in layers}
+
+    def __getitem__(self, name):
+        return self.layers[name]
+
+    def flush(self, surface):
+        for layer in self.layers.values():
+            if layer.items:
+                surface.blits(layer.items, False)  # the rects were kept when queued
+                layer.items.clear()
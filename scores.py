@@ -0,0 +1,94 @@
+import datetime
+import queue
+import sqlite3
+import threading
+import time
+
+import api
+from settings import *
+
+
+class ScoreSubmitter:
+    def __init__(self, outbox_path=SCORES_OUTBOX_PATH):
+        self.outbox_path = outbox_path
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def submit(self, player_name, score):  # never blocks, the worker does the rest
+        self.queue.put((player_name, score, time.time()))
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join(timeout=1)
+
+    def _run(self):
+        # the outbox is owned by this thread, scores stay in it until the API has them
+        db = sqlite3.connect(self.outbox_path)
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS outbox ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "player_name TEXT NOT NULL, "
+            "score INTEGER NOT NULL, "
+            "created_at REAL NOT NULL)"
+        )
+        db.commit()
+
+        retry_delay = 0
+        next_attempt = 0  # scores left from the last session are sent right away
+        while True:
+            pending = db.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+            timeout = max(0, next_attempt - time.time()) if pending else None
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                item = ()
+
+            while item:
+                db.execute(
+                    "INSERT INTO outbox (player_name, score, created_at) VALUES (?, ?, ?)",
+                    item,
+                )
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    item = ()
+            db.commit()
+            if item is None:
+                break
+
+            if time.time() < next_attempt:
+                continue
+            if self._deliver(db):
+                retry_delay = 0
+                next_attempt = 0
+            else:
+                retry_delay = min(
+                    max(retry_delay * 2, SCORES_RETRY_DELAY), SCORES_MAX_RETRY_DELAY
+                )
+                next_attempt = time.time() + retry_delay
+        db.close()
+
+    def _deliver(self, db):  # send a batch of scores, return False if one failed
+        rows = db.execute(
+            "SELECT id, player_name, score FROM outbox ORDER BY id LIMIT ?",
+            (SCORES_BATCH_SIZE,),
+        ).fetchall()
+        for row_id, player_name, score in rows:
+            try:
+                response = api.session().post(
+                    API_URL,
+                    json={"player_name": player_name, "score": score},
+                    timeout=5,
+                )
+                response.raise_for_status()
+            except Exception as e:
+                print(f"Failed to send score to API: {e}")
+                return False
+
+            db.execute("DELETE FROM outbox WHERE id = ?", (row_id,))
+            db.commit()
+            print(
+                f"[{datetime.datetime.now()}] {player_name} - {score}. Sent to API successfully"
+            )
+        return True
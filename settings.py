@@ -5,9 +5,30 @@ GAME_TITLE = WINDOW_NAME
 
 SCREEN_WIDTH, SCREEN_HEIGHT = 1200, 700
 
-FPS = 30
+FPS = 30  # render rate, the gameplay runs at SIMULATION_RATE whatever it is
 DRAW_FPS = True
 
+# camera
+CAMERA_INDEX = 0
+CAMERA_BUFFER_SIZE = 3  # frames kept by the capture thread, older ones are dropped
+
+# hand tracking
+TRACKING_FRAME_SIZE = (300, 169)  # resolution the frames are scanned at
+HAND_TRACKING_MODE = "inline"  # "inline" runs MediaPipe in the game loop, "process" in a worker process
+HAND_TRACKING_ROI = False  # once a hand is found, only scan a crop around it (one player only)
+PLAYERS = 1  # 1 to MAX_PLAYERS players share the camera, one hand each
+MAX_PLAYERS = 4
+PLAYER_MATCH_DISTANCE = 250  # px, a hand further from every player's is a new hand
+PLAYER_LOST_FRAMES = 15  # results a player's hand stays on screen after it was lost
+ROI_INPUT_SIZE = (128, 128)  # the crop is scaled to this size
+ROI_PADDING = 1.0  # margin around the hand on each side, relative to the hand size
+HAND_FILTER = True  # smooth the hand position and predict it over the tracking latency
+HAND_FILTER_MIN_CUTOFF = 1.5  # Hz, smoothing of a still hand
+HAND_FILTER_BETA = 0.01  # opens the smoothing up with the speed (px/s) of the hand
+HAND_FILTER_D_CUTOFF = 1.0  # Hz, smoothing of the speed
+HAND_PREDICTION_MAX = 0.12  # s, the hand is never predicted further than this
+HAND_FILTER_RESET_TIME = 0.3  # s, a hand lost for longer starts over where it is found
+
 # sizes
 BUTTONS_SIZES = (600, 60)
 HAND_SIZE = 200
@@ -22,21 +43,122 @@ BEE_SIZE_RANDOMIZE = (1.2, 1.5)
 
 # drawing
 DRAW_HITBOX = False  # will draw all the hitbox
+DRAW_LANDMARKS = True  # draw the hand landmarks on the camera preview
+SPRITE_CACHE_SIZE = 256  # scaled sprites kept in memory
+SPRITE_SIZE_STEP = 4  # sprite sizes are rounded to X px so they can be shared
+SPRITE_CACHE_PREWARM = True  # scale all the insect sprites when a round starts
+
+# simulation
+SIMULATION_RATE = 30  # fixed gameplay steps per second (movement, spawning, collisions)
+SIMULATION_STEP = 1 / SIMULATION_RATE
+MAX_SIMULATION_STEPS = 5  # per frame, below SIMULATION_RATE / X fps the gameplay slows down
+INTERPOLATE_RENDERING = True  # draw the insects between the last two simulation steps
 
 # animation
 ANIMATION_SPEED = 0.08  # the frame of the insects will change every X sec
+ANIMATION_IN_SYNC = False  # every insect of a kind on the same frame, else each starts on its first
 
 # difficulty
 GAME_DURATION = 60  # the game will last X sec
 BALLOONS_SPAWN_TIME = 1
-BALLOONS_MOVE_SPEED = {"min": 5, "max": 15}
+BALLOONS_MOVE_SPEED = {"min": 5, "max": 15}  # px per simulation step
 BEE_PENALITY = 10  # will remove X of the score of the player (if he kills a bee)
+FRENZY_MODE = False  # high density rounds
+FRENZY_SPAWN_MULTIPLIER = 12  # insects spawned at once in frenzy mode
+
+# performance
+INSECT_POOL_SIZE = 64  # retired insects kept for reuse, per insect type
+GRID_CELL_SIZE = 128  # px, cell size of the collision grid
+TEXT_CACHE_SIZE = 128  # rendered labels kept in memory
+DIRTY_RECT_RENDERING = False  # only redraw and present the parts of the screen that changed
+
+# quality governor: when the frames go over budget, step down to a cheaper level
+QUALITY_GOVERNOR = True
+QUALITY_LEVELS = (  # from the best to the cheapest, each level gives up a bit more
+    {
+        "fps": FPS,
+        "tracking_size": TRACKING_FRAME_SIZE,
+        # both count rendered frames, not camera frames: when one is due and the camera has
+        # nothing new, the next new camera frame is used
+        "inference_interval": 1,  # scan the camera every Nth rendered frame
+        "preview_interval": 1,  # refresh the camera preview every Nth rendered frame
+        "draw_landmarks": DRAW_LANDMARKS,
+        "blur_scale": 4,  # the pause and game over blur works at 1/X size
+    },
+    {
+        "fps": FPS,
+        "tracking_size": TRACKING_FRAME_SIZE,
+        "inference_interval": 1,
+        "preview_interval": 1,
+        "draw_landmarks": False,
+        "blur_scale": 8,
+    },
+    {
+        "fps": FPS,
+        "tracking_size": (224, 126),
+        "inference_interval": 1,
+        "preview_interval": 2,
+        "draw_landmarks": False,
+        "blur_scale": 8,
+    },
+    {
+        "fps": FPS,
+        "tracking_size": (224, 126),
+        "inference_interval": 2,
+        "preview_interval": 2,
+        "draw_landmarks": False,
+        "blur_scale": 8,
+    },
+    {
+        "fps": 24,
+        "tracking_size": (160, 90),
+        "inference_interval": 2,
+        "preview_interval": 3,
+        "draw_landmarks": False,
+        "blur_scale": 16,
+    },
+    {
+        "fps": 20,
+        "tracking_size": (160, 90),
+        "inference_interval": 3,
+        "preview_interval": 4,
+        "draw_landmarks": False,
+        "blur_scale": 16,
+    },
+)
+GOVERNOR_DOWNGRADE_LOAD = 0.9  # step down above this share of the frame budget
+GOVERNOR_UPGRADE_LOAD = 0.6  # step up below this share of the better level's budget
+GOVERNOR_SMOOTHING = 0.05  # weight of the newest frame in the average
+GOVERNOR_DOWNGRADE_HOLD = 1  # s between two steps down
+GOVERNOR_UPGRADE_HOLD = 4  # s at a level before stepping up, doubled when it fails
+GOVERNOR_MAX_UPGRADE_HOLD = 60
+
+# profiling
+PROFILER_OVERLAY = False  # frame time graph and time per stage, F3 toggles it
+PROFILER_TRACE_PATH = None  # write the time of every stage per frame, ".csv" or ".jsonl"
+STARTUP_REPORT = False  # print where the launch time went once the game is ready
+SESSION_RECORD_PATH = None  # record the camera and landmarks to <path>.frames and <path>.npz
+
+# station host (station_host.py)
+INFERENCE_WORKERS = None  # hand tracking processes shared by the stations, None for a core each but one
+STATION_RESTART_DELAY = 8  # s on the game over screen before a station starts a new round
+
+# online
+API_URL = "https://ozgeldi.tech/api/isjo"
+SCORES_OUTBOX_PATH = "scores_outbox.sqlite3"  # scores waiting to be sent to the API
+SCORES_BATCH_SIZE = 10  # scores sent per attempt
+SCORES_RETRY_DELAY = 2  # s, doubled after every failed attempt
+SCORES_MAX_RETRY_DELAY = 300  # s
+LEADERBOARD_SNAPSHOT_PATH = "leaderboard.json"  # last known leaderboard, shown while refreshing
+LEADERBOARD_TTL = 30  # s, the leaderboard is fetched again after X s
+LEADERBOARD_RETRY_DELAY = 5  # s, wait before trying again after a failed fetch
 
 # colors
 COLORS = {
     "title": (38, 61, 93),
     "score": (38, 61, 93),
     "timer": (38, 61, 93),
+    "players": ((38, 61, 93), (160, 40, 0), (20, 110, 40), (120, 40, 140)),
     "buttons": {
         "default": (56, 67, 209),
         "second": (87, 99, 255),
@@ -56,11 +178,17 @@ SOUNDS_VOLUME = 1
 MUSIC_ENABLED = True  # Default to music on
 
 # fonts
-pygame.font.init()
-FONTS = {}
-FONTS["small"] = pygame.font.Font(None, 48)
-FONTS["medium"] = pygame.font.Font(None, 72)
-FONTS["big"] = pygame.font.Font(None, 96)
+FONT_SIZES = {"small": 48, "medium": 72, "big": 96}
+
+
+class _Fonts(dict):  # each font is loaded the first time it is used, not at import
+    def __missing__(self, name):
+        pygame.font.init()
+        font = self[name] = pygame.font.Font(None, FONT_SIZES[name])
+        return font
+
+
+FONTS = _Fonts()
 
 # Add at the top with other window settings
 FULLSCREEN_MODE = False  # Default to windowed mode
@@ -0,0 +1,59 @@
+import numpy as np
+
+from settings import *
+
+_OFFSET = 1 << 15  # keeps the cell coordinates of off-screen insects positive
+_STRIDE = 1 << 16
+
+
+class SpatialGrid:
+    def __init__(self, cell_size=GRID_CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells = {}  # cell key -> set of slot indices
+
+    def cell_keys(self, pos):  # vectorised cell key of every (x, y) in pos
+        cells = np.floor_divide(pos, self.cell_size).astype(np.int64) + _OFFSET
+        return cells[:, 0] * _STRIDE + cells[:, 1]
+
+    def cell_key(self, x, y):
+        cx = int(x // self.cell_size) + _OFFSET
+        cy = int(y // self.cell_size) + _OFFSET
+        return cx * _STRIDE + cy
+
+    def insert(self, slot, key):
+        bucket = self.cells.get(key)
+        if bucket is None:
+            bucket = self.cells[key] = set()
+        bucket.add(slot)
+
+    def discard(self, slot, key):
+        bucket = self.cells[key]
+        bucket.discard(slot)
+        if not bucket:
+            del self.cells[key]
+
+    def relocate(self, slot, old_key, new_key):  # the slot moved to another cell
+        self.discard(slot, old_key)
+        self.insert(slot, new_key)
+
+    def renumber(self, old_slot, new_slot, key):  # the slot index changed, same cell
+        bucket = self.cells[key]
+        bucket.discard(old_slot)
+        bucket.add(new_slot)
+
+    def clear(self):
+        self.cells.clear()
+
+    def query(self, rect):  # sorted slots of every cell that rect overlaps
+        x0 = int(rect.left // self.cell_size) + _OFFSET
+        x1 = int(rect.right // self.cell_size) + _OFFSET
+        y0 = int(rect.top // self.cell_size) + _OFFSET
+        y1 = int(rect.bottom // self.cell_size) + _OFFSET
+        slots = []
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                bucket = self.cells.get(cx * _STRIDE + cy)
+                if bucket:
+                    slots.extend(bucket)
+        slots.sort()
+        return np.array(slots, dtype=np.intp)
@@ -0,0 +1,60 @@
+import threading
+import time
+
+from settings import *
+
+
+class StartupTimer:  # where the launch time goes, on every thread
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.lock = threading.Lock()
+        self.steps = []  # (thread name, step name, started at, duration)
+        self.reported = False
+
+    def record(self, name, started):  # a step that started at `started` just finished
+        now = time.perf_counter()
+        with self.lock:
+            self.steps.append(
+                (threading.current_thread().name, name, started - self.start, now - started)
+            )
+
+    def report(self):
+        self.reported = True
+        with self.lock:
+            steps = sorted(self.steps, key=lambda step: step[2])
+        print(f"{'thread':<12}{'step':<24}{'at ms':>10}{'took ms':>10}")
+        for thread, name, started, duration in steps:
+            print(f"{thread:<12}{name:<24}{started * 1000:>10.1f}{duration * 1000:>10.1f}")
+
+
+class Warmup:  # runs slow setup steps on a background thread while the menu is shown
+    def __init__(self, steps, timer):
+        self.steps = steps  # (name, function) pairs, run in order
+        self.timer = timer
+        self.error = None
+        self.finished = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="warmup", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        try:
+            for name, function in self.steps:
+                started = time.perf_counter()
+                function()
+                self.timer.record(name, started)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.finished.set()
+
+    def done(self):
+        return self.finished.is_set()
+
+    def wait(self):  # block until every step ran, raise what went wrong on this thread
+        self.finished.wait()
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+
+startup = StartupTimer()
@@ -0,0 +1,186 @@
+import argparse
+import math
+import multiprocessing
+import os
+import time
+
+try:
+    import resource
+except ImportError:  # Windows, no CPU and memory totals in the report
+    resource = None
+
+import pygame
+
+from camera import Camera, SyntheticCapture
+from game import Game
+from recording import ReplayCapture
+from scores import ScoreSubmitter
+from tracking_worker import CONTROL_FRAME_SEQ, InferencePool
+from settings import *
+
+# several stations (a camera each) run in this one process, their hands are found by a
+# shared pool of worker processes; the window, when there is one, shows every station
+
+
+class StationGame(Game):  # a game on an offscreen surface, tracked by the pool
+    def __init__(self, surface, camera, pool, station, score_submitter, submit_scores):
+        self.pool = pool  # create_hand_tracking runs in the warm-up, before __init__ returns
+        self.station = station
+        super().__init__(surface, None, camera=camera, score_submitter=score_submitter)
+        self.renderer.display = False
+        self.governor.enabled = False  # the stations share the frame time, not one of them
+        self.player_name = f"Station {station + 1}"
+        self.submit_scores = submit_scores
+        self.over_since = None  # when the game over screen appeared
+        self.frames_drawn = 0
+
+    def create_hand_tracking(self):
+        return self.pool.tracker(self.station, self.window_size)
+
+    def reset(self):
+        super().reset()
+        self.score_saved = not self.submit_scores
+        self.over_since = None
+
+    def overlay_button(self, pos_y, text):  # nobody clicks at a station, rounds restart alone
+        super().overlay_button(pos_y, text)
+        return False
+
+    def run_frame(self, now):
+        self.update()
+        self.renderer.present()
+        self.frames_drawn += 1
+        if self.time_left > 0:
+            return
+        if self.over_since is None:
+            self.over_since = now
+        elif now - self.over_since > STATION_RESTART_DELAY:
+            self.reset()
+
+
+def open_source(name):  # a camera index, a recorded session, a video file or "synthetic"
+    if name == "synthetic":
+        return SyntheticCapture()
+    if os.path.exists(name + ".frames"):
+        return ReplayCapture(name, loop=True)
+    return int(name) if name.isdigit() else name
+
+
+def draw_monitor(window, games):  # every station scaled into a grid
+    columns = math.ceil(math.sqrt(len(games)))
+    rows = math.ceil(len(games) / columns)
+    w, h = window.get_size()
+    tile = (w // columns, h // rows)
+    for i, game in enumerate(games):
+        window.blit(
+            pygame.transform.scale(game.surface, tile),
+            (i % columns * tile[0], i // columns * tile[1]),
+        )
+    pygame.display.flip()
+
+
+def report(games, pool, elapsed):
+    print(f"{len(games)} stations, {len(pool.processes)} inference workers, {elapsed:.1f} s")
+    print(f"{'station':<10}{'fps':>8}{'frames sent':>14}{'results':>10}{'results/s':>12}")
+    for game in games:
+        tracking = game.hand_tracking
+        sent = int(tracking.control[CONTROL_FRAME_SEQ]) // 2  # the frame sequence goes up by 2 per frame
+        print(
+            f"{game.player_name:<10}{game.frames_drawn / elapsed:>8.1f}{sent:>14}"
+            f"{tracking.results_read:>10}{tracking.results_read / elapsed:>12.1f}"
+        )
+
+
+def report_usage():  # once the workers have exited
+    if resource is None:
+        return
+    host = resource.getrusage(resource.RUSAGE_SELF)
+    workers = resource.getrusage(resource.RUSAGE_CHILDREN)
+    print(
+        f"cpu: host {host.ru_utime + host.ru_stime:.1f} s, "
+        f"workers {workers.ru_utime + workers.ru_stime:.1f} s"
+    )
+    # ru_maxrss is in KB on Linux; for the children it is the largest one
+    print(
+        f"max rss: host {host.ru_maxrss / 1024:.0f} MB, "
+        f"largest worker {workers.ru_maxrss / 1024:.0f} MB"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run several stations in one process")
+    parser.add_argument("--stations", type=int, default=2)
+    parser.add_argument(
+        "--cameras",
+        nargs="+",
+        default=["synthetic"],
+        help="a source per station, reused in turn when there are more stations: "
+        "a camera index, a recorded session (SESSION_RECORD_PATH), a video file or "
+        "'synthetic'; synthetic stations never submit scores",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=INFERENCE_WORKERS,
+        help="inference processes, one per core but one by default",
+    )
+    parser.add_argument("--seconds", type=float, help="stop after this long and print a report")
+    parser.add_argument("--headless", action="store_true", help="no window, no sound")
+    parser.add_argument("--window", type=int, nargs=2, default=(SCREEN_WIDTH, SCREEN_HEIGHT))
+    parser.add_argument("--no-scores", action="store_true", help="submit no score")
+    args = parser.parse_args()
+
+    if args.headless:
+        os.environ["SDL_VIDEODRIVER"] = "dummy"
+        os.environ["SDL_AUDIODRIVER"] = "dummy"
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))  # assets are loaded relative to the game
+    pygame.init()
+    pygame.display.set_caption(f"{WINDOW_NAME} - {args.stations} stations")
+    window = pygame.display.set_mode(args.window)
+
+    pool = InferencePool(args.stations, args.workers)
+    score_submitter = ScoreSubmitter()  # one for the outbox of every station
+    games = []
+    for station in range(args.stations):
+        source = args.cameras[station % len(args.cameras)]
+        games.append(
+            StationGame(
+                pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)).convert(),
+                Camera(open_source(source)),
+                pool,
+                station,
+                score_submitter,
+                submit_scores=not args.no_scores and source != "synthetic",
+            )
+        )
+    for game in games:
+        game.reset()
+
+    clock = pygame.time.Clock()
+    started = time.perf_counter()
+    running = True
+    while running:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+        now = time.perf_counter()
+        if args.seconds is not None and now - started > args.seconds:
+            running = False
+        for game in games:
+            game.run_frame(now)
+        if not args.headless:
+            draw_monitor(window, games)
+        clock.tick(FPS)
+
+    report(games, pool, time.perf_counter() - started)
+    for game in games:
+        game.close()
+    pool.close()
+    score_submitter.close()
+    report_usage()
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()  # the inference workers are spawned processes
+    main()
@@ -0,0 +1,304 @@
+import multiprocessing
+import os
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from hand_tracking import HandDetector, HandTracking, landmarks_from_points
+from settings import *
+
+LANDMARKS_COUNT = 21
+
+# control block: frame sequence (odd while the game is writing a frame), running flag,
+# reset counter (the worker resets the model when it changes)
+CONTROL_FRAME_SEQ = 0
+CONTROL_RUNNING = 1
+CONTROL_RESET = 2
+CONTROL_SIZE = 3
+
+# result slot: sequence (odd while the worker is writing), source frame sequence,
+# number of hands found, then the (x, y) of every landmark of every hand
+RESULT_SEQ = 0
+RESULT_FRAME_SEQ = 1
+RESULT_HANDS = 2
+RESULT_POINTS = 3
+RESULT_SIZE = RESULT_POINTS + MAX_PLAYERS * LANDMARKS_COUNT * 2
+
+FRAME_TIMES_SIZE = 16  # capture times of the last frames, results are never older
+
+
+def _attach(name, shape, dtype):
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+
+class _StationScanner:  # the worker side of one station: its buffers and its own model
+    def __init__(self, frame_name, control_name, result_name, frame_shape, players):
+        self.frame_shm, self.frame = _attach(frame_name, frame_shape, np.uint8)
+        self.control_shm, self.control = _attach(control_name, (CONTROL_SIZE,), np.int64)
+        self.result_shm, self.result = _attach(result_name, (RESULT_SIZE,), np.float64)
+        # crops come from the shared frame, the camera frame stays in the game;
+        # MediaPipe tracks the hands from frame to frame, so a model per station
+        self.hands = HandDetector(max_hands=players)
+        self.image = np.empty(frame_shape, dtype=np.uint8)
+        self.points = np.zeros((MAX_PLAYERS, LANDMARKS_COUNT, 2), dtype=np.float64)
+        self.last_seq = 0
+        self.last_reset = 0
+
+    def scan(self):  # scan the newest frame if there is one, return True when it did
+        control, result = self.control, self.result
+        if control[CONTROL_RESET] != self.last_reset:  # a new round
+            self.last_reset = int(control[CONTROL_RESET])
+            self.hands.reset()
+
+        seq = int(control[CONTROL_FRAME_SEQ])
+        if seq == self.last_seq or seq & 1:
+            return False
+        np.copyto(self.image, self.frame)
+        if control[CONTROL_FRAME_SEQ] != seq:  # overwritten while copying, wait for the next one
+            return False
+        self.last_seq = seq
+
+        hands_landmarks = self.hands.process_hands(self.image)[:MAX_PLAYERS]
+        for hand, hand_landmarks in enumerate(hands_landmarks):
+            for i, landmark in enumerate(hand_landmarks.landmark):
+                self.points[hand, i] = landmark.x, landmark.y
+
+        # publish through the seqlock: readers retry while the sequence is odd
+        found = len(hands_landmarks)
+        result[RESULT_SEQ] += 1
+        result[RESULT_FRAME_SEQ] = seq
+        result[RESULT_HANDS] = found
+        result[RESULT_POINTS : RESULT_POINTS + found * LANDMARKS_COUNT * 2] = self.points[
+            :found
+        ].ravel()
+        result[RESULT_SEQ] += 1
+        return True
+
+    def close(self):
+        self.hands.close()
+        del self.frame, self.control, self.result
+        self.frame_shm.close()
+        self.control_shm.close()
+        self.result_shm.close()
+
+
+def _worker_main(stations, players, wake):
+    # stations: the buffer names of every station this worker scans for
+    scanners = [_StationScanner(*names, players) for names in stations]
+    turn = 0  # the station after the last one scanned goes first
+
+    while any(scanner.control[CONTROL_RUNNING] for scanner in scanners):
+        wake.wait(0.1)
+        wake.clear()
+
+        # one frame per station in turn, so a fast station cannot starve the others;
+        # a station that sent several frames meanwhile only gets its newest one scanned
+        for i in range(len(scanners)):
+            station = (turn + i) % len(scanners)
+            if scanners[station].control[CONTROL_RUNNING] and scanners[station].scan():
+                turn = station + 1
+                wake.set()  # look at the other stations again before sleeping
+                break
+
+    for scanner in scanners:
+        scanner.close()
+
+
+class StationBuffers:  # the shared memory between a game and the worker that scans for it
+    def __init__(self, frame_shape):
+        self.frame_shape = frame_shape
+        self.frame_shm = shared_memory.SharedMemory(
+            create=True, size=int(np.prod(frame_shape))
+        )
+        self.control_shm = shared_memory.SharedMemory(
+            create=True, size=CONTROL_SIZE * 8
+        )
+        self.result_shm = shared_memory.SharedMemory(create=True, size=RESULT_SIZE * 8)
+        self.frame = np.ndarray(frame_shape, dtype=np.uint8, buffer=self.frame_shm.buf)
+        self.control = np.ndarray(
+            (CONTROL_SIZE,), dtype=np.int64, buffer=self.control_shm.buf
+        )
+        self.result = np.ndarray(
+            (RESULT_SIZE,), dtype=np.float64, buffer=self.result_shm.buf
+        )
+        self.control[:] = 0
+        self.control[CONTROL_RUNNING] = 1
+        self.result[:] = 0
+
+    def names(self):  # what a worker needs to attach to them
+        return (
+            self.frame_shm.name,
+            self.control_shm.name,
+            self.result_shm.name,
+            self.frame_shape,
+        )
+
+    def close(self):
+        del self.frame, self.control, self.result
+        for shm in (self.frame_shm, self.control_shm, self.result_shm):
+            shm.close()
+            shm.unlink()
+
+
+def _stop(processes, buffers, wakes):  # ask the workers to stop, then free the buffers
+    for station in buffers:
+        station.control[CONTROL_RUNNING] = 0
+    for wake in wakes:
+        wake.set()
+    for process in processes:
+        process.join(timeout=2)
+        if process.is_alive():
+            process.terminate()
+    for station in buffers:
+        station.close()
+
+
+class HandTrackingWorker(HandTracking):
+    fixed_frame_size = True  # the shared frame cannot change size
+
+    def __init__(self, window_size, players=PLAYERS):
+        self.process = None
+        self.buffers = None
+        super().__init__(window_size, players)
+
+    def start(self):  # spawn the worker, once for the whole session
+        if self.buffers is not None:
+            return
+        # spawn instead of fork: the parent already runs SDL and the camera thread
+        context = multiprocessing.get_context("spawn")
+        self.attach(
+            StationBuffers((TRACKING_FRAME_SIZE[1], TRACKING_FRAME_SIZE[0], 3)),
+            context.Event(),
+        )
+        self.process = context.Process(
+            target=_worker_main,
+            args=([self.buffers.names()], len(self.hands), self.wake),
+            daemon=True,
+        )
+        self.process.start()
+
+    def attach(self, buffers, wake):  # the buffers a worker scans, and the event that wakes it
+        self.buffers = buffers
+        self.frame = buffers.frame
+        self.control = buffers.control
+        self.result = buffers.result
+        self.wake = wake
+        self.last_result_seq = 0
+        self.reset_frame_seq = 0  # results for frames up to this one belong to the last round
+        self.frame_times = [(0, None)] * FRAME_TIMES_SIZE  # (frame seq, capture time)
+        self.results_read = 0  # new results, against the frames sent
+
+    def reset(self):
+        super().reset()
+        if self.buffers is not None:
+            self.reset_frame_seq = int(self.control[CONTROL_FRAME_SEQ])
+            self.control[CONTROL_RESET] += 1
+            self.wake.set()
+
+    def scan_hands(self, image, source=None, timestamp=None):
+        # hand the frame to the worker, the odd sequence marks it as being written
+        self.control[CONTROL_FRAME_SEQ] += 1
+        np.copyto(self.frame, image)
+        self.control[CONTROL_FRAME_SEQ] += 1
+        self.wake.set()
+        frame_seq = int(self.control[CONTROL_FRAME_SEQ])
+        self.frame_times[frame_seq // 2 % FRAME_TIMES_SIZE] = (frame_seq, timestamp)
+
+        # use the most recent result, whatever frame it came from
+        hands_points = self.read_result()
+        if hands_points is not None:
+            self.update_hands([landmarks_from_points(points) for points in hands_points])
+            # the result is a few frames old, the filter needs to know how old
+            seq, self.result_time = self.frame_times[
+                self.result_frame_seq // 2 % FRAME_TIMES_SIZE
+            ]
+            if seq != self.result_frame_seq:  # older than the ring remembers
+                self.result_time = None
+        self.draw_hands(image)
+        return image
+
+    def read_result(self):  # return the landmarks of every hand found, or None when not new
+        for _ in range(3):
+            seq = self.result[RESULT_SEQ]
+            if seq == self.last_result_seq:
+                return None
+            if int(seq) & 1:
+                continue
+            frame_seq = self.result[RESULT_FRAME_SEQ]
+            found = int(self.result[RESULT_HANDS])
+            points = (
+                self.result[RESULT_POINTS : RESULT_POINTS + found * LANDMARKS_COUNT * 2]
+                .reshape(found, LANDMARKS_COUNT, 2)
+                .copy()
+            )
+            if self.result[RESULT_SEQ] != seq:  # torn read, try again
+                continue
+            self.last_result_seq = seq
+            self.result_frame_seq = int(frame_seq)
+            self.results_read += 1
+            if frame_seq <= self.reset_frame_seq:  # seen before the round started
+                return None
+            return points
+        return None
+
+    def close(self):
+        if self.process is None:
+            return
+        del self.frame, self.control, self.result
+        _stop([self.process], [self.buffers], [self.wake])
+        self.process = None
+        self.buffers = None
+
+
+class InferencePool:  # worker processes shared by the games of a station host
+    def __init__(self, stations, workers=INFERENCE_WORKERS, players=PLAYERS):
+        if workers is None:  # a core is left for the games
+            workers = (os.cpu_count() or 2) - 1
+        workers = max(1, min(workers, stations))
+        self.players = players
+        context = multiprocessing.get_context("spawn")
+        frame_shape = (TRACKING_FRAME_SIZE[1], TRACKING_FRAME_SIZE[0], 3)
+        self.buffers = [StationBuffers(frame_shape) for _ in range(stations)]
+        self.wakes = [context.Event() for _ in range(workers)]
+        # a station always goes to the same worker, where its model tracks its hands;
+        # each worker takes its stations in turn
+        self.processes = [
+            context.Process(
+                target=_worker_main,
+                args=(
+                    [station.names() for station in self.buffers[worker::workers]],
+                    players,
+                    self.wakes[worker],
+                ),
+                daemon=True,
+            )
+            for worker in range(workers)
+        ]
+        for process in self.processes:
+            process.start()
+
+    def tracker(self, station, window_size):
+        return PooledHandTracking(window_size, self, station)
+
+    def close(self):  # after the trackers were closed
+        if self.processes:
+            _stop(self.processes, self.buffers, self.wakes)
+            self.processes = []
+
+
+class PooledHandTracking(HandTrackingWorker):  # one station of an InferencePool
+    def __init__(self, window_size, pool, station):
+        self.pool = pool
+        self.station = station
+        super().__init__(window_size, pool.players)
+
+    def start(self):
+        if self.buffers is None:
+            wakes = self.pool.wakes
+            self.attach(self.pool.buffers[self.station], wakes[self.station % len(wakes)])
+
+    def close(self):  # the pool owns the buffers and the workers
+        if self.buffers is not None:
+            del self.frame, self.control, self.result
+            self.buffers = None
@@ -1,3 +1,5 @@
+from collections import OrderedDict
+
 import pygame
 
 import image
@@ -7,6 +9,31 @@ _last_click_time = 0
 _button_cooldown = 200  # milliseconds
 _last_toggle_time = 0  # Add at the top with other globals
 _toggle_cooldown = 200  # milliseconds
+_text_cache = OrderedDict()  # rendered labels, least recently used first
+_glyph_atlases = {}
+
+
+def render_text(text, color, font, shadow=False, shadow_color=(0, 0, 0), shadow_offset=2):
+    # return the label (with its shadow) as one surface, rendered only once
+    key = (text, font, color, shadow and shadow_color, shadow and shadow_offset)
+    label = _text_cache.get(key)
+    if label is not None:
+        _text_cache.move_to_end(key)
+        return label
+
+    label = font.render(text, 1, color)
+    if shadow:  # make the shadow
+        label_shadow = font.render(text, 1, shadow_color)
+        w, h = label.get_size()
+        composed = pygame.Surface((w + shadow_offset, h + shadow_offset), pygame.SRCALPHA)
+        composed.blit(label_shadow, (0, shadow_offset))
+        composed.blit(label, (shadow_offset, 0))
+        label = composed
+
+    _text_cache[key] = label
+    if len(_text_cache) > TEXT_CACHE_SIZE:
+        _text_cache.popitem(last=False)
+    return label
 
 
 def draw_text(
@@ -14,36 +41,113 @@ def draw_text(
     text,
     pos,
     color,
-    font=FONTS["medium"],
+    font=None,
     pos_mode="top_left",
     shadow=False,
     shadow_color=(0, 0, 0),
     shadow_offset=2,
 ):
-    label = font.render(text, 1, color)
-    label_rect = label.get_rect()
+    if font is None:
+        font = FONTS["medium"]
+    label = render_text(text, color, font, shadow, shadow_color, shadow_offset)
+    label_rect = pygame.Rect(0, 0, *font.size(text))
     if pos_mode == "top_left":
         label_rect.x, label_rect.y = pos
     elif pos_mode == "center":
         label_rect.center = pos
 
-    if shadow:  # make the shadow
-        label_shadow = font.render(text, 1, shadow_color)
-        surface.blit(
-            label_shadow, (label_rect.x - shadow_offset, label_rect.y + shadow_offset)
+    if shadow:  # the shadow is drawn left of the text
+        label_rect.x -= shadow_offset
+
+    return surface.blit(label, label_rect)  # draw the text
+
+
+class GlyphAtlas:  # prerendered characters, to draw numbers that change every frame
+    characters = "0123456789.-: "
+
+    def __init__(self, font, color, shadow_color=None, shadow_offset=2):
+        self.font = font
+        self.shadow_offset = shadow_offset
+        self.glyphs = {}
+        self.shadows = {}
+        for character in self.characters:
+            self.glyphs[character] = font.render(character, 1, color)
+            if shadow_color is not None:
+                self.shadows[character] = font.render(character, 1, shadow_color)
+
+    def draw(self, surface, text, pos):
+        y = pos[1]
+        glyphs = []
+        shadows = []
+        for i, character in enumerate(text):
+            # measuring is cheap and keeps the kerning of the full string
+            x = pos[0] + self.font.size(text[:i])[0]
+            glyphs.append((self.glyphs[character], (x, y)))
+            if self.shadows:
+                shadows.append(
+                    (
+                        self.shadows[character],
+                        (x - self.shadow_offset, y + self.shadow_offset),
+                    )
+                )
+
+        # all the shadows first, like a shadowed label
+        rects = surface.blits(shadows) + surface.blits(glyphs)
+        return rects[0].unionall(rects[1:]) if rects else pygame.Rect(pos, (0, 0))
+
+
+def draw_counter(
+    surface,
+    text,
+    value,
+    pos,
+    color,
+    font=None,
+    shadow=False,
+    shadow_color=(0, 0, 0),
+    shadow_offset=2,
+):
+    # the static text comes from the text cache, the value from a glyph atlas
+    if font is None:
+        font = FONTS["medium"]
+    key = (font, color, shadow and shadow_color, shadow_offset)
+    atlas = _glyph_atlases.get(key)
+    if atlas is None:
+        atlas = _glyph_atlases[key] = GlyphAtlas(
+            font, color, shadow_color if shadow else None, shadow_offset
         )
 
-    surface.blit(label, label_rect)  # draw the text
+    rect = draw_text(
+        surface,
+        text,
+        pos,
+        color,
+        font=font,
+        shadow=shadow,
+        shadow_color=shadow_color,
+        shadow_offset=shadow_offset,
+    )
+    value_pos = (pos[0] + font.size(text)[0], pos[1])
+    return rect.union(atlas.draw(surface, str(value), value_pos))
+
+
+def button_rect(pos_y, pos_x=None):
+    return pygame.Rect(
+        ((pos_x if pos_x else SCREEN_WIDTH) // 2 - BUTTONS_SIZES[0] // 2, pos_y),
+        BUTTONS_SIZES,
+    )
+
+
+def button_area(pos_y, pos_x=None):  # what a button covers, shadow included
+    rect = button_rect(pos_y, pos_x)
+    return rect.union(rect.move(-6, -6))
 
 
 def button(surface, pos_y, text=None, click_sound=None, pos_x=None, disabled=False):
     global _last_click_time
     current_time = pygame.time.get_ticks()
 
-    rect = pygame.Rect(
-        ((pos_x if pos_x else SCREEN_WIDTH) // 2 - BUTTONS_SIZES[0] // 2, pos_y),
-        BUTTONS_SIZES,
-    )
+    rect = button_rect(pos_y, pos_x)
 
     on_button = False
     if rect.collidepoint(pygame.mouse.get_pos()) and not disabled: